@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CvConfig(AppConfig):
     name = 'cv'
+
+    def ready(self):
+        from . import signals  # noqa: F401
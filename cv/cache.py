@@ -0,0 +1,385 @@
+import hashlib
+
+import time
+
+from itertools import combinations
+
+
+from django.conf import settings
+
+from django.core.cache import cache
+
+
+
+# =========================
+
+# SECCIONES DEL PDF (checks del modal)
+
+# =========================
+
+SECCIONES_PDF = ("exp", "cursos", "recon", "pa", "pl", "vg")
+
+
+# Subir cuando cambie el dibujo del PDF: invalida cachés y ETags aunque el contenido sea igual
+
+VERSION_RENDER = 4
+
+
+# Lo mismo para las páginas HTML (plantillas, vistas): entra en sus ETags y en sus cachés
+
+VERSION_PAGINAS = 1
+
+
+# Lo que viene marcado por defecto en el modal de home.html
+
+SECCIONES_MODAL_DEFAULT = ("exp", "cursos", "recon", "pa", "pl")
+
+
+
+# Calidad de salida (?calidad=): web es lo de siempre, print para imprimir en papel,
+
+# texto sin imágenes ni certificados (no toca el storage)
+
+CALIDADES_PDF = ("web", "print", "texto")
+
+CALIDAD_DEFAULT = "web"
+
+
+
+def normalizar_calidad(params):
+
+    calidad = params.get("calidad")
+
+    return calidad if calidad in CALIDADES_PDF else CALIDAD_DEFAULT
+
+
+
+def opciones_calidad(calidad):
+
+    """
+
+    dpi / jpeg: resolución y calidad de las imágenes reducidas; imagenes: si se dibujan
+
+    foto, certificados (imagen y PDF) y grid.
+
+    """
+
+    if calidad == "texto":
+
+        return {"dpi": None, "jpeg": None, "imagenes": False}
+
+    if calidad == "print":
+
+        return {"dpi": settings.CV_PDF_PRINT_DPI, "jpeg": settings.CV_PDF_PRINT_JPEG_QUALITY, "imagenes": True}
+
+    return {"dpi": settings.CV_PDF_IMAGE_DPI, "jpeg": settings.CV_PDF_JPEG_QUALITY, "imagenes": True}
+
+
+
+def normalizar_secciones(params):
+
+    """
+
+    Devuelve las secciones pedidas en orden fijo.
+
+    Sin ningún check en la URL se imprime todo (como siempre).
+
+    """
+
+    elegidas = tuple(k for k in SECCIONES_PDF if k in params)
+
+    return elegidas or SECCIONES_PDF
+
+
+
+# =========================
+
+# PERFIL ACTIVO
+
+# =========================
+
+PERFIL_ACTIVO_KEY = "cv:perfil-activo"
+
+
+
+def invalidar_perfil_activo():
+
+    # Datospersonales.save (que también apaga los demás perfiles) y el borrado de un perfil
+
+    cache.delete(PERFIL_ACTIVO_KEY)
+
+
+
+# =========================
+
+# VERSIÓN DE CONTENIDO POR PERFIL
+
+# =========================
+
+def _version_key(perfil_id, seccion=None):
+
+    if seccion:
+
+        return f"cv:version:{perfil_id}:{seccion}"
+
+    return f"cv:version:{perfil_id}"
+
+
+
+def get_version(perfil_id, seccion=None):
+
+    """
+
+    Versión actual del contenido del perfil (o de una sola sección, para los fragmentos del PDF).
+
+    Si la clave no existe (caché vacía) se crea una nueva, nunca se reutiliza una vieja.
+
+    """
+
+    key = _version_key(perfil_id, seccion)
+
+    version = cache.get(key)
+
+    if version is None:
+
+        cache.add(key, time.time_ns(), timeout=None)
+
+        version = cache.get(key)
+
+    return version
+
+
+
+def bump_version(perfil_id, seccion=None):
+
+    # Lo llaman los signals: todo lo cacheado con la versión anterior queda huérfano.
+
+    # Un cambio en una sección cambia también la versión del perfil (el PDF completo).
+
+    ahora = time.time_ns()
+
+    versiones = {_version_key(perfil_id): ahora}
+
+    if seccion:
+
+        versiones[_version_key(perfil_id, seccion)] = ahora
+
+    cache.set_many(versiones, timeout=None)
+
+
+
+# =========================
+
+# VERSIÓN POR REGISTRO (fragmentos de las páginas de sección)
+
+# =========================
+
+def _version_fila_key(modelo, pk):
+
+    return f"cv:version:fila:{modelo._meta.label_lower}:{pk}"
+
+
+
+def get_versiones_filas(modelo, pks):
+
+    """
+
+    {pk: versión} de cada registro, en una sola lectura. Igual que get_version:
+
+    la que falta se crea nueva, así una tarjeta vieja nunca vuelve a servirse.
+
+    """
+
+    keys = {_version_fila_key(modelo, pk): pk for pk in pks}
+
+    versiones = cache.get_many(list(keys))
+
+    faltan = [k for k in keys if k not in versiones]
+
+    if faltan:
+
+        ahora = time.time_ns()
+
+        for k in faltan:
+
+            cache.add(k, ahora, timeout=None)
+
+        versiones.update(cache.get_many(faltan))
+
+        versiones.update({k: ahora for k in faltan if k not in versiones})
+
+    return {keys[k]: v for k, v in versiones.items()}
+
+
+
+def bump_version_fila(modelo, pk):
+
+    cache.set(_version_fila_key(modelo, pk), time.time_ns(), timeout=None)
+
+
+
+def _render():
+
+    # Con poco presupuesto de memoria las imágenes salen con menos DPI (siempre las mismas):
+
+    # otro presupuesto es otro PDF
+
+    return f"{VERSION_RENDER}-{settings.CV_PDF_MEMORY_BUDGET_MB}"
+
+
+
+def pdf_cache_key(perfil_id, version, secciones, calidad=CALIDAD_DEFAULT):
+
+    return f"cv:pdf:{_render()}:{perfil_id}:{version}:{'-'.join(secciones)}:{calidad}"
+
+
+
+def conteos_key(perfil_id, version):
+
+    # Conteos de registros por sección de home.html
+
+    return f"cv:home-counts:{perfil_id}:{version}"
+
+
+
+def estado_seccion_key(perfil_id, seccion, version):
+
+    # MAX(updated_at) y COUNT de una sección (Last-Modified / ETag de su página)
+
+    return f"cv:seccion-estado:{perfil_id}:{seccion}:{version}"
+
+
+
+def pagina_key(perfil_id, version, ruta):
+
+    # Respuesta completa de una página pública (views._cache_pagina); ruta = path + querystring
+
+    ruta_hash = hashlib.sha1(ruta.encode()).hexdigest()
+
+    return f"cv:pagina:{VERSION_PAGINAS}:{perfil_id}:{version}:{ruta_hash}"
+
+
+
+def fragmento_key(perfil_id, nombre, versiones, calidad=CALIDAD_DEFAULT):
+
+    # Fragmento del PDF (páginas de certificados de una sección, grid de imágenes)
+
+    return f"cv:pdf-frag:{_render()}:{perfil_id}:{nombre}:{'-'.join(str(v) for v in versiones)}:{calidad}"
+
+
+
+def pdf_etag(perfil_id, version, secciones, calidad=CALIDAD_DEFAULT):
+
+    # ETag fuerte: el PDF es determinista (invariant), mismos datos => mismos bytes
+
+    base = f"{_render()}:{perfil_id}:{version}:{'-'.join(secciones)}:{calidad}"
+
+    return hashlib.sha1(base.encode()).hexdigest()
+
+
+
+# =========================
+
+# VARIANTES DEL PDF (pre-render)
+
+# =========================
+
+def variantes_pdf():
+
+    """
+
+    Todas las combinaciones distintas de checks (63: el caso "ninguno" es igual a "todas").
+
+    """
+
+    out = []
+
+    for n in range(len(SECCIONES_PDF), 0, -1):
+
+        out.extend(combinations(SECCIONES_PDF, n))
+
+    return out
+
+
+
+def _hits_key(perfil_id, secciones):
+
+    return f"cv:pdf-hits:{perfil_id}:{'-'.join(secciones)}"
+
+
+
+def registrar_pedido(perfil_id, secciones):
+
+    # Contador por variante para saber cuáles conviene precalentar
+
+    key = _hits_key(perfil_id, secciones)
+
+    cache.add(key, 0, timeout=None)
+
+    try:
+
+        cache.incr(key)
+
+    except ValueError:
+
+        pass
+
+
+
+def variantes_probables(perfil_id, top=5):
+
+    """
+
+    Las que casi seguro se piden (todas / default del modal) + las más pedidas según los contadores.
+
+    """
+
+    variantes = variantes_pdf()
+
+    hits = cache.get_many([_hits_key(perfil_id, v) for v in variantes])
+
+    pedidas = sorted(
+
+        (v for v in variantes if hits.get(_hits_key(perfil_id, v))),
+
+        key=lambda v: hits[_hits_key(perfil_id, v)],
+
+        reverse=True,
+
+    )
+
+
+    out = [SECCIONES_PDF, SECCIONES_MODAL_DEFAULT]
+
+    for v in pedidas[:top]:
+
+        if v not in out:
+
+            out.append(v)
+
+    return out
+
+
+
+def estado_variantes(perfil_id):
+
+    version = get_version(perfil_id)
+
+    hits = cache.get_many([_hits_key(perfil_id, v) for v in variantes_pdf()])
+
+    return [
+
+        {
+
+            "secciones": list(v),
+
+            "caliente": cache.has_key(pdf_cache_key(perfil_id, version, v)),
+
+            "pedidos": hits.get(_hits_key(perfil_id, v), 0),
+
+        }
+
+        for v in variantes_pdf()
+
+    ]
+
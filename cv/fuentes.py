@@ -0,0 +1,87 @@
+import os
+
+import threading
+
+
+from reportlab.pdfbase import pdfmetrics
+
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+
+# =========================
+
+# FUENTES DEL PDF
+
+# =========================
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+
+
+# (archivo regular, archivo bold, nombre regular, nombre bold) en orden de preferencia
+
+CANDIDATAS = [
+
+    ("DejaVuSans.ttf", "DejaVuSans-Bold.ttf", "DejaVuSans", "DejaVuSans-Bold"),
+
+]
+
+
+_fuentes = None
+
+_lock = threading.Lock()
+
+
+
+def registrar_fuentes():
+
+    """
+
+    Registra las TTF que vienen con la app UNA vez por proceso y devuelve (regular, bold).
+
+    ReportLab embebe las TTF como subconjuntos: solo van al PDF los glifos usados.
+
+    Si no hay ninguna disponible se usa Helvetica (la de siempre).
+
+    """
+
+    global _fuentes
+
+    if _fuentes is not None:
+
+        return _fuentes
+
+
+    with _lock:
+
+        if _fuentes is None:
+
+            _fuentes = _cargar_fuentes()
+
+    return _fuentes
+
+
+
+def _cargar_fuentes():
+
+    for reg_file, bold_file, reg_name, bold_name in CANDIDATAS:
+
+        reg_path = os.path.join(FONTS_DIR, reg_file)
+
+        bold_path = os.path.join(FONTS_DIR, bold_file)
+
+        try:
+
+            pdfmetrics.registerFont(TTFont(reg_name, reg_path))
+
+            pdfmetrics.registerFont(TTFont(bold_name, bold_path))
+
+            return reg_name, bold_name
+
+        except Exception:
+
+            continue
+
+
+    return "Helvetica", "Helvetica-Bold"
+
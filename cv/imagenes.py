@@ -0,0 +1,283 @@
+import hashlib
+
+import io
+
+import os
+
+
+from django.conf import settings
+
+from django.core.cache import cache
+
+
+from PIL import Image, ImageOps
+
+
+
+# =========================
+
+# IMÁGENES PARA EL PDF
+
+# =========================
+
+def _tiene_transparencia(img):
+
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+
+def _caja_px(box_w, box_h, dpi):
+
+    return max(1, round(box_w / 72 * dpi)), max(1, round(box_h / 72 * dpi))
+
+
+
+# `origen` es la imagen original: bytes, o la ruta de un archivo temporal (prefetch del PDF)
+
+# para no tener el blob entero en memoria.
+
+def _leer(origen):
+
+    if isinstance(origen, bytes):
+
+        return origen
+
+    with open(origen, "rb") as fh:
+
+        return fh.read()
+
+
+
+def _tamano(origen):
+
+    return len(origen) if isinstance(origen, bytes) else os.path.getsize(origen)
+
+
+
+def digest_imagen(origen):
+
+    if isinstance(origen, bytes):
+
+        return hashlib.sha256(origen).hexdigest()
+
+    h = hashlib.sha256()
+
+    with open(origen, "rb") as fh:
+
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+
+def reducir_imagen(origen, box_w, box_h, dpi=None, calidad=None, digest=None, presupuesto=None):
+
+    """
+
+    Devuelve los bytes de la imagen reducida al tamaño en que se dibuja (caja en puntos PDF)
+
+    a `dpi` y recomprimida en JPEG. Con transparencia queda en PNG para no perder el fondo.
+
+    El resultado se cachea por hash del contenido, así el mismo blob no se procesa dos veces
+
+    (`digest` permite pasar el sha256 si quien llama ya lo calculó).
+
+    Con `presupuesto` (PresupuestoImagenes del render) el dpi puede bajar para no pasarse de memoria.
+
+    """
+
+    dpi = dpi or settings.CV_PDF_IMAGE_DPI
+
+    calidad = calidad or settings.CV_PDF_JPEG_QUALITY
+
+    if presupuesto is not None:
+
+        dpi = presupuesto.dpi_para(box_w, box_h, dpi)
+
+
+    max_w, max_h = _caja_px(box_w, box_h, dpi)
+
+
+    digest = digest or digest_imagen(origen)
+
+    key = f"cv:img:{digest}:{max_w}x{max_h}:{calidad}"
+
+    result = cache.get(key)
+
+    if result is None:
+
+        result = _reducir(origen, max_w, max_h, calidad)
+
+        cache.set(key, result, settings.CV_PDF_CACHE_TIMEOUT)
+
+
+    if presupuesto is not None:
+
+        presupuesto.consumir(len(result))
+
+    return result
+
+
+
+def _reducir(origen, max_w, max_h, calidad):
+
+    try:
+
+        img = Image.open(io.BytesIO(origen) if isinstance(origen, bytes) else origen)
+
+        # JPEG: decodifica directo a escala reducida (mucho más rápido que decodificar 12 MP)
+
+        img.draft("RGB", (max_w, max_h))
+
+        img = ImageOps.exif_transpose(img)
+
+        img.thumbnail((max_w, max_h), Image.LANCZOS)
+
+
+        out = io.BytesIO()
+
+        if _tiene_transparencia(img):
+
+            img.convert("RGBA").save(out, "PNG", optimize=True)
+
+        else:
+
+            img.convert("RGB").save(out, "JPEG", quality=calidad, optimize=True, progressive=True)
+
+        result = out.getvalue()
+
+    except Exception:
+
+        # Si Pillow no la puede abrir se deja la original (ReportLab decide si la dibuja)
+
+        return _leer(origen)
+
+
+    # Una imagen chica ya comprimida puede crecer al recomprimir
+
+    if len(result) > _tamano(origen):
+
+        return _leer(origen)
+
+    return result
+
+
+
+# =========================
+
+# PRESUPUESTO DE MEMORIA (por render)
+
+# =========================
+
+DPI_MINIMO = 72
+
+
+
+class PresupuestoImagenes:
+
+    """
+
+    Memoria que un render puede dedicar a imágenes: lo ya embebido en el canvas (queda en
+
+    memoria hasta c.save()) más lo que ocupa decodificar la imagen en curso. Si no alcanza,
+
+    se baja el DPI (hasta DPI_MINIMO) en vez de arriesgar que el worker muera por OOM.
+
+    """
+
+
+    def __init__(self, limite_bytes):
+
+        self.limite = limite_bytes
+
+        self.usado = 0
+
+        self.degradadas = 0
+
+
+    @staticmethod
+
+    def costo_decodificar(box_w, box_h, dpi):
+
+        # draft() decodifica entre 1x y 2x la caja por lado (hasta 4x píxeles), en RGB,
+
+        # más la copia reducida de thumbnail()
+
+        max_w, max_h = _caja_px(box_w, box_h, dpi)
+
+        return max_w * max_h * 3 * 5
+
+
+    def dpi_para(self, box_w, box_h, dpi):
+
+        pedido = dpi
+
+        while dpi > DPI_MINIMO and self.usado + self.costo_decodificar(box_w, box_h, dpi) > self.limite:
+
+            dpi = max(DPI_MINIMO, int(dpi * 0.75))
+
+        if dpi != pedido:
+
+            self.degradadas += 1
+
+        return dpi
+
+
+    def consumir(self, n_bytes):
+
+        self.usado += n_bytes
+
+
+
+# =========================
+
+# MINIATURAS (grid de imágenes del PDF)
+
+# =========================
+
+# En Azure los nombres no se pisan (AZURE_OVERWRITE = False): el nombre del blob identifica
+
+# el contenido, así que la miniatura se cachea por nombre y en la siguiente impresión
+
+# ni siquiera hace falta bajar la imagen original.
+
+def _miniatura_key(nombre, box_w, box_h, dpi, calidad):
+
+    max_w, max_h = _caja_px(box_w, box_h, dpi or settings.CV_PDF_IMAGE_DPI)
+
+    nombre_hash = hashlib.sha1(nombre.encode()).hexdigest()
+
+    return f"cv:thumb:{nombre_hash}:{max_w}x{max_h}:{calidad or settings.CV_PDF_JPEG_QUALITY}"
+
+
+
+def miniaturas_cacheadas(nombres, box_w, box_h, dpi=None, calidad=None):
+
+    """
+
+    {nombre del blob: bytes} de las miniaturas que ya están hechas para esa caja.
+
+    """
+
+    keys = {_miniatura_key(n, box_w, box_h, dpi, calidad): n for n in nombres}
+
+    return {keys[k]: v for k, v in cache.get_many(list(keys)).items()}
+
+
+
+def miniatura(nombre, origen, box_w, box_h, dpi=None, calidad=None, presupuesto=None):
+
+    degradadas = presupuesto.degradadas if presupuesto else 0
+
+    result = reducir_imagen(origen, box_w, box_h, dpi=dpi, calidad=calidad, presupuesto=presupuesto)
+
+    # Una miniatura achicada por el presupuesto no se guarda como si fuera la del dpi pedido
+
+    if not presupuesto or presupuesto.degradadas == degradadas:
+
+        cache.set(_miniatura_key(nombre, box_w, box_h, dpi, calidad), result, settings.CV_PDF_CACHE_TIMEOUT)
+
+    return result
+
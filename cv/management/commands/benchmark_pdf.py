@@ -0,0 +1,520 @@
+import io
+
+import json
+
+import resource
+
+import tempfile
+
+import time
+
+import tracemalloc
+
+from datetime import date, datetime, timedelta
+
+from itertools import count
+
+from pathlib import Path
+
+
+from django.conf import settings
+
+from django.core.cache import cache
+
+from django.core.files.base import ContentFile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django.db import connections, transaction
+
+from django.test import RequestFactory, override_settings
+
+
+from PIL import Image, ImageDraw
+
+from PyPDF2 import PdfReader
+
+
+from cv.models import (
+
+    Datospersonales,
+
+    Cursosrealizados,
+
+    Experiencialaboral,
+
+    Productosacademicos,
+
+    Productoslaborales,
+
+    Reconocimientos,
+
+)
+
+from cv.views import imprimir_hoja_vida
+
+
+
+# =========================
+
+# ESCENARIOS
+
+# =========================
+
+# certificados: cuántos registros llevan imagen de certificado; imagen: (ancho, alto) en px
+
+ESCENARIOS = {
+
+    "chico": {"cursos": 3, "experiencias": 2, "productos": 2, "certificados": 2, "imagen": (1200, 900)},
+
+    "mediano": {"cursos": 15, "experiencias": 8, "productos": 6, "certificados": 10, "imagen": (2400, 1800)},
+
+    "grande": {"cursos": 60, "experiencias": 25, "productos": 20, "certificados": 40, "imagen": (4000, 3000)},
+
+}
+
+
+TEXTO_LARGO = (
+
+    "Responsable del análisis, diseño e implementación de módulos; coordinación con el equipo, "
+
+    "revisión de código y soporte a usuarios finales. "
+
+)
+
+
+
+class _Rollback(Exception):
+
+    pass
+
+
+
+class Command(BaseCommand):
+
+    help = (
+
+        "Mide imprimir_hoja_vida con perfiles sintéticos (tiempo, memoria pico, páginas y bytes). "
+
+        "Corre sobre una base de prueba descartable (como el test runner), nunca sobre la configurada, "
+
+        "y las imágenes van a un storage local temporal."
+
+    )
+
+
+    def add_arguments(self, parser):
+
+        parser.add_argument("--escenario", action="append", choices=sorted(ESCENARIOS), help="Se puede repetir. Por defecto: todos.")
+
+        parser.add_argument("--cursos", type=int, help="Escenario 'custom': cantidad de cursos.")
+
+        parser.add_argument("--experiencias", type=int, default=5)
+
+        parser.add_argument("--productos", type=int, default=5)
+
+        parser.add_argument("--certificados", type=int, default=5)
+
+        parser.add_argument("--imagen", default="2400x1800", help="Tamaño de las imágenes del escenario 'custom' (ANCHOxALTO).")
+
+        parser.add_argument("--repeticiones", type=int, default=3)
+
+        parser.add_argument("--salida", default=str(Path(settings.BASE_DIR) / "benchmarks"))
+
+        parser.add_argument("--comparar", help="JSON de una corrida anterior para mostrar la diferencia.")
+
+
+    def handle(self, *args, **opts):
+
+        escenarios = {k: ESCENARIOS[k] for k in (opts["escenario"] or ESCENARIOS)}
+
+        if opts["cursos"] is not None:
+
+            try:
+
+                ancho, alto = (int(v) for v in opts["imagen"].lower().split("x"))
+
+            except ValueError:
+
+                raise CommandError("--imagen debe ser ANCHOxALTO, por ejemplo 2400x1800")
+
+            escenarios = {"custom": {
+
+                "cursos": opts["cursos"],
+
+                "experiencias": opts["experiencias"],
+
+                "productos": opts["productos"],
+
+                "certificados": opts["certificados"],
+
+                "imagen": (ancho, alto),
+
+            }}
+
+
+        # Base descartable: en producción la configurada es Postgres y el perfil sintético
+
+        # (perfilactivo=True) bloquearía las filas de los demás perfiles durante toda la corrida
+
+        conexion = connections["default"]
+
+        nombre_base = conexion.settings_dict["NAME"]
+
+        conexion.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+
+        resultados = []
+
+        try:
+
+            with tempfile.TemporaryDirectory() as media_dir, override_settings(
+
+                STORAGES={**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"}},
+
+                MEDIA_ROOT=media_dir,
+
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark-pdf"}},
+
+            ):
+
+                for nombre, escenario in escenarios.items():
+
+                    resultados.append(self._medir(nombre, escenario, opts["repeticiones"]))
+
+        finally:
+
+            conexion.creation.destroy_test_db(nombre_base, verbosity=0)
+
+
+        salida = Path(opts["salida"])
+
+        salida.mkdir(parents=True, exist_ok=True)
+
+        archivo = salida / f"pdf-{datetime.now():%Y%m%d-%H%M%S}.json"
+
+        archivo.write_text(json.dumps({"fecha": datetime.now().isoformat(), "resultados": resultados}, indent=2))
+
+        self.stdout.write(f"Resultados guardados en {archivo}")
+
+
+        if opts["comparar"]:
+
+            self._comparar(Path(opts["comparar"]), resultados)
+
+
+    # =========================
+
+    # Medición
+
+    # =========================
+
+    def _medir(self, nombre, escenario, repeticiones):
+
+        try:
+
+            with transaction.atomic():
+
+                perfil = self._crear_perfil(escenario)
+
+                corridas = [self._render(perfil, frio=True) for _ in range(repeticiones)]
+
+                cacheada = self._render(perfil, frio=False)
+
+                # tracemalloc hace más lento el render: la memoria se mide en una corrida aparte
+
+                memoria = self._render(perfil, frio=True, trazar=True)
+
+                raise _Rollback
+
+        except _Rollback:
+
+            pass
+
+
+        tiempos = sorted(r["segundos"] for r in corridas)
+
+        resultado = {
+
+            "escenario": nombre,
+
+            "parametros": {**escenario, "imagen": list(escenario["imagen"])},
+
+            "segundos_mediana": tiempos[len(tiempos) // 2],
+
+            "segundos_min": tiempos[0],
+
+            "segundos_cacheado": cacheada["segundos"],
+
+            "memoria_pico_mb": memoria["memoria_pico_mb"],
+
+            "rss_max_mb": memoria["rss_max_mb"],
+
+            "paginas": corridas[0]["paginas"],
+
+            "bytes": corridas[0]["bytes"],
+
+        }
+
+        self.stdout.write(
+
+            f"{nombre:<10} {resultado['segundos_mediana']:7.3f} s  (cache {resultado['segundos_cacheado']:.3f} s)  "
+
+            f"pico {resultado['memoria_pico_mb']:7.1f} MB  {resultado['paginas']:4d} pág  {resultado['bytes'] / 1024:9.1f} KB"
+
+        )
+
+        return resultado
+
+
+    def _render(self, perfil, frio, trazar=False):
+
+        if frio:
+
+            cache.clear()
+
+
+        request = RequestFactory().get("/imprimir/")
+
+        if trazar:
+
+            tracemalloc.start()
+
+        inicio = time.perf_counter()
+
+        response = imprimir_hoja_vida(request)
+
+        contenido = b"".join(response.streaming_content) if response.streaming else response.content
+
+        segundos = time.perf_counter() - inicio
+
+        pico = 0
+
+        if trazar:
+
+            _, pico = tracemalloc.get_traced_memory()
+
+            tracemalloc.stop()
+
+
+        if response.status_code != 200:
+
+            raise CommandError(f"imprimir_hoja_vida respondió {response.status_code}")
+
+
+        return {
+
+            "segundos": segundos,
+
+            "memoria_pico_mb": pico / (1024 * 1024),
+
+            "rss_max_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+
+            "paginas": len(PdfReader(io.BytesIO(contenido)).pages),
+
+            "bytes": len(contenido),
+
+        }
+
+
+    # =========================
+
+    # Datos sintéticos
+
+    # =========================
+
+    def _crear_perfil(self, escenario):
+
+        ancho, alto = escenario["imagen"]
+
+        n_imagen = count(1)
+
+
+        perfil = Datospersonales(
+
+            nombres="Perfil",
+
+            apellidos="Sintetico",
+
+            fechanacimiento=date(1990, 1, 1),
+
+            numerocedula=self._cedula_libre(),
+
+            perfilactivo=True,
+
+            permitir_impresion=True,
+
+            descripcionperfil="Perfil sintético para medir el render del PDF.",
+
+        )
+
+        perfil.foto_perfil.save("foto.jpg", ContentFile(self._imagen(ancho, alto)), save=False)
+
+        perfil.save()
+
+
+        certificados = escenario["certificados"]
+
+        inicio = date(2005, 1, 1)
+
+
+        for i in range(escenario["cursos"]):
+
+            curso = Cursosrealizados(
+
+                perfil=perfil,
+
+                nombrecurso=f"Curso {i}",
+
+                fechainicio=inicio + timedelta(days=30 * i),
+
+                fechafin=inicio + timedelta(days=30 * i + 20),
+
+                totalhoras=40,
+
+                entidadpatrocinadora="Entidad",
+
+                descripcioncurso=TEXTO_LARGO[:200],
+
+            )
+
+            if certificados > 0:
+
+                curso.certificado_imagen.save(f"curso_{i}.jpg", ContentFile(self._imagen(ancho, alto, next(n_imagen))), save=False)
+
+                certificados -= 1
+
+            curso.save()
+
+
+        for i in range(escenario["experiencias"]):
+
+            exp = Experiencialaboral(
+
+                perfil=perfil,
+
+                nombrempresa=f"Empresa {i}",
+
+                cargodesempenado="Desarrollador",
+
+                fechainicio=inicio + timedelta(days=180 * i),
+
+                fechafin=inicio + timedelta(days=180 * i + 150),
+
+                responsabilidades=TEXTO_LARGO * 8,
+
+            )
+
+            if certificados > 0:
+
+                exp.certificado_imagen.save(f"exp_{i}.jpg", ContentFile(self._imagen(ancho, alto, next(n_imagen))), save=False)
+
+                certificados -= 1
+
+            exp.save()
+
+
+        for i in range(escenario["productos"]):
+
+            pa = Productosacademicos(perfil=perfil, nombreproducto=f"Producto académico {i}", clasificador="ARTICULO", descripcion=TEXTO_LARGO * 2)
+
+            pa.imagenproducto.save(f"pa_{i}.jpg", ContentFile(self._imagen(ancho, alto, next(n_imagen))), save=False)
+
+            pa.save()
+
+
+            pl = Productoslaborales(perfil=perfil, nombreproducto=f"Producto laboral {i}", fechaproducto=inicio + timedelta(days=60 * i), descripcion=TEXTO_LARGO * 2)
+
+            pl.imagenproducto.save(f"pl_{i}.jpg", ContentFile(self._imagen(ancho, alto, next(n_imagen))), save=False)
+
+            pl.save()
+
+
+            rec = Reconocimientos(perfil=perfil, tiporeconocimiento="Académico", fechareconocimiento=inicio + timedelta(days=90 * i), entidadpatrocinadora=f"Entidad {i}")
+
+            if certificados > 0:
+
+                rec.certificado_imagen.save(f"rec_{i}.jpg", ContentFile(self._imagen(ancho, alto, next(n_imagen))), save=False)
+
+                certificados -= 1
+
+            rec.save()
+
+
+        return perfil
+
+
+    def _cedula_libre(self):
+
+        # numerocedula es única: se busca una que no exista en la base donde se corre
+
+        for n in range(10 ** 10 - 1, 0, -1):
+
+            cedula = f"{n:010d}"
+
+            if not Datospersonales.objects.filter(numerocedula=cedula).exists():
+
+                return cedula
+
+
+    def _imagen(self, ancho, alto, n=0):
+
+        """
+
+        JPEG de ruido (comprime como una foto real; un color plano sería irrealmente liviano).
+
+        Cada `n` da un contenido distinto para que la deduplicación por hash no falsee la medición.
+
+        """
+
+        if getattr(self, "_ruido", None) is None or self._ruido.size != (ancho, alto):
+
+            self._ruido = Image.effect_noise((ancho, alto), 64).convert("RGB")
+
+
+        img = self._ruido.copy()
+
+        ImageDraw.Draw(img).rectangle((0, 0, ancho // 4, alto // 4), fill=((n * 37) % 256, (n * 91) % 256, (n * 53) % 256))
+
+        buffer = io.BytesIO()
+
+        img.save(buffer, "JPEG", quality=90)
+
+        return buffer.getvalue()
+
+
+    # =========================
+
+    # Comparación
+
+    # =========================
+
+    def _comparar(self, archivo, resultados):
+
+        try:
+
+            anteriores = {r["escenario"]: r for r in json.loads(archivo.read_text())["resultados"]}
+
+        except (OSError, ValueError, KeyError) as exc:
+
+            raise CommandError(f"No se pudo leer {archivo}: {exc}")
+
+
+        self.stdout.write(f"Comparación con {archivo}:")
+
+        for r in resultados:
+
+            prev = anteriores.get(r["escenario"])
+
+            if not prev:
+
+                continue
+
+            for campo in ("segundos_mediana", "memoria_pico_mb", "bytes", "paginas"):
+
+                antes, ahora = prev[campo], r[campo]
+
+                cambio = ((ahora - antes) / antes * 100) if antes else 0
+
+                self.stdout.write(f"  {r['escenario']:<10} {campo:<18} {antes:>12.3f} -> {ahora:>12.3f} ({cambio:+.1f}%)")
+
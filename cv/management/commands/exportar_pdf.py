@@ -0,0 +1,184 @@
+import multiprocessing
+
+import os
+
+import tempfile
+
+import time
+
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pathlib import Path
+
+
+from django.conf import settings
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+from cv.cache import CALIDAD_DEFAULT, CALIDADES_PDF, SECCIONES_PDF
+
+from cv.models import Datospersonales
+
+from cv.tareas import exportar_perfil, iniciar_worker
+
+
+
+class Command(BaseCommand):
+
+    help = (
+
+        "Exporta el PDF de la hoja de vida de todos los perfiles (o los indicados) en un pool de procesos, "
+
+        "a un directorio o a un zip."
+
+    )
+
+
+    def add_arguments(self, parser):
+
+        parser.add_argument("--perfil", type=int, action="append", help="idperfil a exportar. Se puede repetir. Por defecto: todos.")
+
+        parser.add_argument("--secciones", help=f"Códigos separados por coma ({','.join(SECCIONES_PDF)}). Por defecto: todas.")
+
+        parser.add_argument("--calidad", choices=CALIDADES_PDF, default=CALIDAD_DEFAULT)
+
+        parser.add_argument("--destino", default=str(Path(settings.BASE_DIR) / "exportes"), help="Directorio de salida.")
+
+        parser.add_argument("--zip", help="Archivo .zip de salida (en vez de --destino).")
+
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+
+        parser.add_argument(
+
+            "--prefetch-timeout",
+
+            type=float,
+
+            default=120,
+
+            help="Segundos para bajar las imágenes y PDFs de cada perfil (acá no hay nadie esperando la respuesta).",
+
+        )
+
+
+    def handle(self, *args, **opts):
+
+        secciones = SECCIONES_PDF
+
+        if opts["secciones"]:
+
+            pedidas = [s.strip() for s in opts["secciones"].split(",") if s.strip()]
+
+            desconocidas = set(pedidas) - set(SECCIONES_PDF)
+
+            if desconocidas:
+
+                raise CommandError(f"Secciones desconocidas: {', '.join(sorted(desconocidas))}")
+
+            # Mismo orden fijo que normalizar_secciones
+
+            secciones = tuple(k for k in SECCIONES_PDF if k in pedidas)
+
+
+        perfiles = Datospersonales.objects.order_by("idperfil")
+
+        if opts["perfil"]:
+
+            perfiles = perfiles.filter(idperfil__in=opts["perfil"])
+
+            faltan = set(opts["perfil"]) - set(perfiles.values_list("idperfil", flat=True))
+
+            if faltan:
+
+                raise CommandError(f"No existen los perfiles: {', '.join(map(str, sorted(faltan)))}")
+
+        ids = list(perfiles.values_list("idperfil", flat=True))
+
+
+        if opts["zip"]:
+
+            # Los workers escriben en un temporal y acá se agrega cada PDF al zip apenas termina
+
+            with tempfile.TemporaryDirectory(prefix="cv-export-") as directorio:
+
+                with zipfile.ZipFile(opts["zip"], "w", zipfile.ZIP_STORED) as zf:
+
+                    errores, incompletos = self._exportar(ids, secciones, opts, directorio, zf)
+
+            salida = opts["zip"]
+
+        else:
+
+            Path(opts["destino"]).mkdir(parents=True, exist_ok=True)
+
+            errores, incompletos = self._exportar(ids, secciones, opts, opts["destino"], None)
+
+            salida = opts["destino"]
+
+
+        self.stdout.write(f"{len(ids) - errores} de {len(ids)} perfiles exportados en {salida}")
+
+        if errores or incompletos:
+
+            raise CommandError(f"{errores} perfiles con error, {incompletos} incompletos (imágenes o PDFs que no se pudieron bajar)")
+
+
+    def _exportar(self, ids, secciones, opts, directorio, zf):
+
+        ctx = multiprocessing.get_context("spawn")
+
+        inicio = time.perf_counter()
+
+        errores = incompletos = 0
+
+
+        with ProcessPoolExecutor(max_workers=opts["workers"], mp_context=ctx, initializer=iniciar_worker) as pool:
+
+            futuros = {
+
+                pool.submit(exportar_perfil, pk, secciones, opts["calidad"], directorio, opts["prefetch_timeout"]): pk
+
+                for pk in ids
+
+            }
+
+            for fut in as_completed(futuros):
+
+                try:
+
+                    perfil_id, ruta, size, segundos, completo = fut.result()
+
+                except Exception as exc:
+
+                    errores += 1
+
+                    self.stderr.write(f"  perfil {futuros[fut]}: error: {exc}")
+
+                    continue
+
+
+                if zf is not None:
+
+                    # Los PDFs ya vienen comprimidos: se guardan tal cual (ZIP_STORED)
+
+                    zf.write(ruta, arcname=os.path.basename(ruta))
+
+                    os.remove(ruta)
+
+
+                if not completo:
+
+                    incompletos += 1
+
+                marca = "" if completo else "  INCOMPLETO"
+
+                self.stdout.write(f"  perfil {perfil_id:<6} {size / 1024:9.1f} KB {segundos:7.2f} s  {os.path.basename(ruta)}{marca}")
+
+
+        self.stdout.write(f"Total: {time.perf_counter() - inicio:.2f} s")
+
+        return errores, incompletos
+
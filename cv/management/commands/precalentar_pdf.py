@@ -0,0 +1,95 @@
+import multiprocessing
+
+import os
+
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+from django.core.management.base import BaseCommand
+
+
+from cv.cache import get_version, variantes_pdf, variantes_probables
+
+from cv.models import Datospersonales
+
+from cv.tareas import iniciar_worker, precalentar_variante
+
+
+
+class Command(BaseCommand):
+
+    help = "Pre-renderiza las variantes del PDF de la hoja de vida en un pool de procesos local."
+
+
+    def add_arguments(self, parser):
+
+        parser.add_argument("--todas", action="store_true", help="Las 63 combinaciones de secciones, no solo las probables.")
+
+        parser.add_argument("--top", type=int, default=5, help="Cuántas variantes más pedidas sumar a las de siempre.")
+
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+
+        parser.add_argument("--vigilar", action="store_true", help="Queda corriendo y vuelve a precalentar cuando cambia el contenido.")
+
+        parser.add_argument("--intervalo", type=float, default=10.0, help="Segundos entre chequeos de versión con --vigilar.")
+
+
+    def handle(self, *args, **opts):
+
+        ctx = multiprocessing.get_context("spawn")
+
+        versiones_vistas = {}
+
+
+        with ProcessPoolExecutor(max_workers=opts["workers"], mp_context=ctx, initializer=iniciar_worker) as pool:
+
+            while True:
+
+                perfiles = Datospersonales.objects.filter(perfilactivo=True, permitir_impresion=True)
+
+                for perfil in perfiles:
+
+                    version = get_version(perfil.pk)
+
+                    if versiones_vistas.get(perfil.pk) == version:
+
+                        continue
+
+
+                    self._precalentar(pool, perfil, opts)
+
+                    versiones_vistas[perfil.pk] = version
+
+
+                if not opts["vigilar"]:
+
+                    break
+
+                time.sleep(opts["intervalo"])
+
+
+    def _precalentar(self, pool, perfil, opts):
+
+        variantes = variantes_pdf() if opts["todas"] else variantes_probables(perfil.pk, opts["top"])
+
+        self.stdout.write(f"Perfil {perfil.pk} ({perfil}): {len(variantes)} variantes")
+
+
+        futuros = [pool.submit(precalentar_variante, perfil.pk, v) for v in variantes]
+
+        for fut in as_completed(futuros):
+
+            try:
+
+                secciones, size, segundos = fut.result()
+
+            except Exception as exc:
+
+                self.stderr.write(f"  error: {exc}")
+
+                continue
+
+            self.stdout.write(f"  {'-'.join(secciones):<28} {size / 1024:8.1f} KB {segundos:6.2f} s")
+
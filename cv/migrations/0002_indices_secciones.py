@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cursosrealizados',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-fechafin', '-fechainicio', '-idcursorealizado'], name='ix_curso_visible_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='experiencialaboral',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-fechafin', '-fechainicio', '-idexperiencialaboral'], name='ix_exp_visible_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='productosacademicos',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-idproductoacademico'], name='ix_prodacad_visible_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='productoslaborales',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-fechaproducto', '-idproductolaboral'], name='ix_prodlab_visible_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='reconocimientos',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-fechareconocimiento', '-idreconocimiento'], name='ix_recon_visible_orden'),
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-fecha', '-idventagarage'], name='ix_venta_visible_orden'),
+        ),
+    ]
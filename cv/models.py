@@ -19,7 +19,10 @@ from django.core.validators import (
 
 )
 
-from django.db import models
+from django.db import models, transaction
+
+
+from .cache import invalidar_perfil_activo
 
 
 
@@ -308,6 +311,11 @@ class Datospersonales(models.Model):
     sitioweb = models.URLField(max_length=200, blank=True, null=True)
 
 
+    # Última modificación (Last-Modified / ETag de las páginas del front)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+
     class Meta:
 
         db_table = "DATOSPERSONALES"
@@ -352,6 +360,10 @@ class Datospersonales(models.Model):
 
             Datospersonales.objects.exclude(pk=self.pk).update(perfilactivo=False)
 
+        # Después del commit: antes, un request podría volver a cachear el perfil viejo
+
+        transaction.on_commit(invalidar_perfil_activo)
+
 
     def __str__(self):
 
@@ -459,6 +471,9 @@ class Cursosrealizados(CertificadoMixin, models.Model):
     rutacertificado = models.CharField(max_length=200, blank=True, null=True)
 
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+
     class Meta:
 
         db_table = "CURSOSREALIZADOS"
@@ -475,6 +490,24 @@ class Cursosrealizados(CertificadoMixin, models.Model):
 
         ]
 
+        # Parcial (solo filas visibles en el front) y con el mismo orden que la vista de la sección,
+
+        # así la lista sale del índice sin ordenar en memoria. Igual en las demás secciones.
+
+        indexes = [
+
+            models.Index(
+
+                fields=["perfil", "-fechafin", "-fechainicio", "-idcursorealizado"],
+
+                condition=models.Q(activarparaqueseveaenfront=True),
+
+                name="ix_curso_visible_orden",
+
+            )
+
+        ]
+
 
     def clean(self):
 
@@ -573,6 +606,9 @@ class Experiencialaboral(CertificadoMixin, models.Model):
     descripcionfunciones = models.CharField(max_length=100, blank=True, null=True)
 
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+
     class Meta:
 
         db_table = "EXPERIENCIALABORAL"
@@ -589,6 +625,20 @@ class Experiencialaboral(CertificadoMixin, models.Model):
 
         ]
 
+        indexes = [
+
+            models.Index(
+
+                fields=["perfil", "-fechafin", "-fechainicio", "-idexperiencialaboral"],
+
+                condition=models.Q(activarparaqueseveaenfront=True),
+
+                name="ix_exp_visible_orden",
+
+            )
+
+        ]
+
 
     def clean(self):
 
@@ -658,6 +708,9 @@ class Productosacademicos(CertificadoMixin, models.Model):
     rutaimagen = models.CharField(max_length=200, blank=True, null=True)
 
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+
     class Meta:
 
         db_table = "PRODUCTOSACADEMICOS"
@@ -674,6 +727,20 @@ class Productosacademicos(CertificadoMixin, models.Model):
 
         ]
 
+        indexes = [
+
+            models.Index(
+
+                fields=["perfil", "-idproductoacademico"],
+
+                condition=models.Q(activarparaqueseveaenfront=True),
+
+                name="ix_prodacad_visible_orden",
+
+            )
+
+        ]
+
 
 
 # =========================
@@ -728,6 +795,9 @@ class Productoslaborales(CertificadoMixin, models.Model):
     rutaimagen = models.CharField(max_length=200, blank=True, null=True)
 
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+
     class Meta:
 
         db_table = "PRODUCTOSLABORALES"
@@ -744,6 +814,20 @@ class Productoslaborales(CertificadoMixin, models.Model):
 
         ]
 
+        indexes = [
+
+            models.Index(
+
+                fields=["perfil", "-fechaproducto", "-idproductolaboral"],
+
+                condition=models.Q(activarparaqueseveaenfront=True),
+
+                name="ix_prodlab_visible_orden",
+
+            )
+
+        ]
+
 
     def clean(self):
 
@@ -827,6 +911,9 @@ class Reconocimientos(CertificadoMixin, models.Model):
     rutacertificado = models.URLField(max_length=200, blank=True, null=True)
 
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+
     class Meta:
 
         db_table = "RECONOCIMIENTOS"
@@ -843,6 +930,20 @@ class Reconocimientos(CertificadoMixin, models.Model):
 
         ]
 
+        indexes = [
+
+            models.Index(
+
+                fields=["perfil", "-fechareconocimiento", "-idreconocimiento"],
+
+                condition=models.Q(activarparaqueseveaenfront=True),
+
+                name="ix_recon_visible_orden",
+
+            )
+
+        ]
+
 
     def clean(self):
 
@@ -938,6 +1039,9 @@ class Ventagarage(models.Model):
     foto_producto = models.ImageField(upload_to="venta_garage/", blank=True, null=True)
 
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+
     class Meta:
 
         db_table = "VENTAGARAGE"
@@ -954,6 +1058,20 @@ class Ventagarage(models.Model):
 
         ]
 
+        indexes = [
+
+            models.Index(
+
+                fields=["perfil", "-fecha", "-idventagarage"],
+
+                condition=models.Q(activarparaqueseveaenfront=True),
+
+                name="ix_venta_visible_orden",
+
+            )
+
+        ]
+
 
     def clean(self):
 
@@ -0,0 +1,1579 @@
+import hashlib
+
+import io
+
+import os
+
+import tempfile
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from functools import lru_cache
+
+
+from django.conf import settings
+
+from django.core.cache import cache
+
+
+from reportlab.lib.pagesizes import A4
+
+from reportlab.lib.units import cm
+
+from reportlab.lib import colors
+
+from reportlab.pdfgen import canvas
+
+from reportlab.lib.utils import ImageReader, simpleSplit
+
+
+from PyPDF2 import PdfReader, PdfWriter
+
+
+from .cache import CALIDAD_DEFAULT, fragmento_key, get_version, opciones_calidad, pdf_cache_key
+
+from .fuentes import registrar_fuentes
+
+from .imagenes import PresupuestoImagenes, digest_imagen, miniatura, miniaturas_cacheadas, reducir_imagen
+
+
+
+# =========================
+
+# Helpers
+
+# =========================
+
+def _spool_field(field, directorio):
+
+    """
+
+    Copia el blob por trozos a un archivo temporal de `directorio` y devuelve la ruta:
+
+    la descarga no pasa entera por memoria y Pillow decodifica desde el archivo
+
+    (PyPDF2 sí lo lee entero al abrirlo: ver el presupuesto en _dibujar_pdf).
+
+    """
+
+    fd, ruta = tempfile.mkstemp(dir=directorio)
+
+    with os.fdopen(fd, "wb") as out:
+
+        field.open("rb")
+
+        try:
+
+            for chunk in field.chunks():
+
+                out.write(chunk)
+
+        finally:
+
+            try:
+
+                field.close()
+
+            except Exception:
+
+                pass
+
+    return ruta
+
+
+
+# Un solo pool de descargas por proceso (requests y trabajos en segundo plano): una descarga
+
+# colgada ocupa uno de sus hilos pero no puede acumular hilos nuevos en cada impresión.
+
+_prefetch_executor = None
+
+_prefetch_lock = threading.Lock()
+
+
+
+def _get_prefetch_executor():
+
+    # Se crea en el primer uso, ya dentro del worker (después del fork de gunicorn)
+
+    global _prefetch_executor
+
+    with _prefetch_lock:
+
+        if _prefetch_executor is None:
+
+            _prefetch_executor = ThreadPoolExecutor(max_workers=settings.CV_PDF_PREFETCH_WORKERS, thread_name_prefix="cv-blob")
+
+        return _prefetch_executor
+
+
+
+def _prefetch_blobs(fields, directorio, timeout=None):
+
+    """
+
+    Baja en paralelo todos los blobs (imágenes, PDFs) que se van a usar a archivos de `directorio`.
+
+    Devuelve ({nombre del blob: ruta}, {nombres que no se pudieron bajar}).
+
+    Todas juntas tienen `timeout` segundos (por defecto CV_PDF_PREFETCH_TIMEOUT; un solo plazo
+
+    para el render, no uno por blob): lo que no terminó para entonces se abandona.
+
+    Lo que falla se dibuja sin esa imagen/PDF, pero ese render no se cachea (ver generar_pdf).
+
+    """
+
+    pendientes_por_nombre = {}
+
+    for field in fields:
+
+        if field and getattr(field, "name", None):
+
+            pendientes_por_nombre.setdefault(field.name, field)
+
+
+    if not pendientes_por_nombre:
+
+        return {}, set()
+
+
+    out = {}
+
+    pool = _get_prefetch_executor()
+
+    futuros = {pool.submit(_spool_field, f, directorio): name for name, f in pendientes_por_nombre.items()}
+
+    listos, pendientes = wait(futuros, timeout=timeout or settings.CV_PDF_PREFETCH_TIMEOUT)
+
+    for fut in listos:
+
+        try:
+
+            out[futuros[fut]] = fut.result()
+
+        except Exception:
+
+            pass
+
+    # Las que ni empezaron no se bajan; una que ya está corriendo termina sola en su hilo
+
+    for fut in pendientes:
+
+        fut.cancel()
+
+    return out, set(pendientes_por_nombre) - set(out)
+
+
+
+def _reader_from_prefetch(blobs, field, box_w, box_h, lectores, dpi=None, calidad=None, presupuesto=None, fallidos=None):
+
+    """
+
+    ImageReader de `field` reducido a la caja (en puntos) en que se dibuja, a `dpi`/`calidad`
+
+    (None = lo de settings, ver reducir_imagen; `presupuesto` lo puede bajar).
+
+    `lectores` guarda uno por (hash del contenido, caja): la misma imagen usada en varios
+
+    registros, aunque sean blobs distintos, se decodifica y reduce una sola vez, y ReportLab
+
+    la embebe una sola vez (identifica las imágenes por el digest de sus datos).
+
+    Un campo con imagen cuyo blob no está (no se pudo bajar) se anota en `fallidos`.
+
+    """
+
+    nombre = getattr(field, "name", None)
+
+    ruta = blobs.get(nombre or "")
+
+    if ruta is None:
+
+        if nombre and fallidos is not None:
+
+            fallidos.add(nombre)
+
+        return None
+
+
+    digest = digest_imagen(ruta)
+
+    key = (digest, round(box_w), round(box_h))
+
+    if key not in lectores:
+
+        lectores[key] = ImageReader(io.BytesIO(reducir_imagen(ruta, box_w, box_h, dpi=dpi, calidad=calidad, digest=digest, presupuesto=presupuesto)))
+
+    return lectores[key]
+
+
+
+# =========================
+
+# PDFs de certificados (PyPDF2)
+
+# =========================
+
+# Bytes de cada PDF de certificado en la caché compartida, por nombre del blob (en Azure los
+
+# nombres no se pisan: AZURE_OVERWRITE = False), así no se vuelven a bajar.
+
+# Cada ensamblado arma sus propios PdfReader: PyPDF2 resuelve los objetos con seek/read sobre
+
+# un único stream, y compartir un lector entre hilos (trabajos en segundo plano + requests)
+
+# mezclaría las lecturas.
+
+def _certificado_pdf_key(nombre):
+
+    return f"cv:cert-pdf:{hashlib.sha1(nombre.encode()).hexdigest()}"
+
+
+
+def _certificados_cacheados(nombres):
+
+    """
+
+    {nombre del blob: bytes} de los PDFs de certificado que ya están en la caché.
+
+    """
+
+    keys = {_certificado_pdf_key(n): n for n in nombres}
+
+    return {keys[k]: v for k, v in cache.get_many(list(keys)).items()}
+
+
+
+def _abrir_pdf(data):
+
+    reader = PdfReader(io.BytesIO(data))
+
+    if reader.is_encrypted:
+
+        reader.decrypt("")
+
+    len(reader.pages)  # si no se puede parsear, que falle acá y no a mitad del ensamblado
+
+    return reader
+
+
+
+def _ensamblar_pdf(base, fragmentos, fields, blobs, cacheados, destino, fallidos):
+
+    """
+
+    Copia las páginas de ReportLab (`base`), detrás las de cada fragmento ya dibujado (bytes)
+
+    y al final las de cada PDF de certificado (de `cacheados` o de lo bajado en `blobs`),
+
+    escribiendo el resultado directo en `destino`.
+
+    Un PDF de certificado que no se pudo bajar se omite y se anota en `fallidos`; uno que
+
+    se bajó pero no se puede leer se omite sin más (el próximo render fallaría igual).
+
+    """
+
+    writer = PdfWriter()
+
+    base_reader = PdfReader(base)
+
+    for page in base_reader.pages:
+
+        writer.add_page(page)
+
+    if base_reader.metadata:
+
+        writer.add_metadata(base_reader.metadata)
+
+
+    for fragmento in fragmentos:
+
+        for page in PdfReader(io.BytesIO(fragmento)).pages:
+
+            writer.add_page(page)
+
+
+    for field in fields:
+
+        data = cacheados.get(field.name)
+
+        if data is None:
+
+            ruta = blobs.get(field.name)
+
+            if ruta is None:
+
+                fallidos.add(field.name)
+
+                continue
+
+            with open(ruta, "rb") as fh:
+
+                data = fh.read()
+
+        try:
+
+            reader = _abrir_pdf(data)
+
+        except Exception:
+
+            continue
+
+        if field.name not in cacheados:
+
+            cache.set(_certificado_pdf_key(field.name), data, settings.CV_PDF_CACHE_TIMEOUT)
+
+
+        for page in reader.pages:
+
+            writer.add_page(page)
+
+
+    writer.write(destino)
+
+
+
+def _clean(value):
+
+    if value is None:
+
+        return ""
+
+    if isinstance(value, str):
+
+        return value.strip()
+
+    return str(value)
+
+
+
+@lru_cache(maxsize=4096)
+
+def _wrap_lines(text, font_name, font_size, max_width):
+
+    """
+
+    Líneas ya medidas por (texto, fuente, tamaño, ancho), cacheadas por proceso:
+
+    al cambiar un filtro o editar un ítem, el resto de textos no se vuelve a medir.
+
+    """
+
+    return tuple(simpleSplit(text, font_name, font_size, max_width))
+
+
+
+def _draw_wrapped(c, text, x, y, max_width, font_name, font_size, leading):
+
+    if not text or not str(text).strip():
+
+        return y
+
+    lines = _wrap_lines(str(text), font_name, font_size, max_width)
+
+    for ln in lines:
+
+        c.drawString(x, y, ln)
+
+        y -= leading
+
+    return y
+
+
+
+def _pairs_from_fields(pairs):
+
+    out = []
+
+    for label, val in pairs:
+
+        val = _clean(val)
+
+        if val:
+
+            out.append((label, val))
+
+    return out
+
+
+
+def _collect_images(perfil, cursos, experiencias, prod_acad, prod_lab, reconoc):
+
+    """
+
+    certificados: imágenes tipo certificado (una por hoja)
+
+    normales: imágenes tipo "foto del producto" (en grid)
+
+    """
+
+    certificados = []
+
+    normales = []
+
+
+    def add_cert(codigo, section, label, field):
+
+        if field and getattr(field, "name", None):
+
+            certificados.append({"codigo": codigo, "section": section, "label": label, "field": field})
+
+
+    def add_normal(codigo, section, label, field, kind="Imagen"):
+
+        if field and getattr(field, "name", None):
+
+            normales.append({"codigo": codigo, "section": section, "label": f"{label} — {kind}", "field": field})
+
+
+    for c_ in cursos:
+
+        base = f'Curso "{c_.nombrecurso or "Sin título"}"'
+
+        add_cert("cursos", "Cursos", base, c_.certificado_imagen)
+
+
+    for e in experiencias:
+
+        cargo = e.cargodesempenado or "Sin título"
+
+        emp = f" - {e.nombrempresa}" if e.nombrempresa else ""
+
+        base = f'Experiencia "{cargo}{emp}"'
+
+        add_cert("exp", "Experiencia laboral", base, e.certificado_imagen)
+
+
+    for p in prod_acad:
+
+        base = f'Producto académico "{p.nombreproducto or "Sin título"}"'
+
+        add_normal("pa", "Productos académicos", base, p.imagenproducto, "Imagen del producto")
+
+        add_cert("pa", "Productos académicos", base, p.certificado_imagen)
+
+
+    for p in prod_lab:
+
+        base = f'Producto laboral "{p.nombreproducto or "Sin título"}"'
+
+        add_normal("pl", "Productos laborales", base, p.imagenproducto, "Imagen del producto")
+
+        add_cert("pl", "Productos laborales", base, p.certificado_imagen)
+
+
+    # ✅ FIX: en tu modelo el campo es entidadpatrocinadora
+
+    for r in reconoc:
+
+        tipo = r.tiporeconocimiento or "Reconocimiento"
+
+        ent = f" - {r.entidadpatrocinadora}" if r.entidadpatrocinadora else ""
+
+        base = f'Reconocimiento "{tipo}{ent}"'
+
+        add_cert("recon", "Reconocimientos", base, r.certificado_imagen)
+
+
+    return certificados, normales
+
+
+
+def _collect_pdfs(cursos, experiencias, prod_acad, prod_lab, reconoc):
+
+    """
+
+    certificado_pdf que se anexan al final del CV.
+
+    Si el registro tiene imagen de certificado se usa esa (como en las secciones web)
+
+    para no imprimir el mismo certificado dos veces.
+
+    """
+
+    pdfs = []
+
+    for grupo in (cursos, experiencias, prod_acad, prod_lab, reconoc):
+
+        for it in grupo:
+
+            if getattr(it.certificado_imagen, "name", None):
+
+                continue
+
+            if it.certificado_pdf and getattr(it.certificado_pdf, "name", None):
+
+                pdfs.append(it.certificado_pdf)
+
+    return pdfs
+
+
+
+# =========================
+
+# Consultas (mismo orden que las vistas web)
+
+# =========================
+
+def _consultar_secciones(perfil, secciones):
+
+    """
+
+    Solo consulta las secciones pedidas; las demás quedan vacías.
+
+    """
+
+    def activos(qs, *orden):
+
+        return list(qs.filter(activarparaqueseveaenfront=True).order_by(*orden))
+
+
+    return {
+
+        "exp": activos(perfil.experiencias, "-fechafin", "-fechainicio", "-idexperiencialaboral") if "exp" in secciones else [],
+
+        "cursos": activos(perfil.cursos, "-fechafin", "-fechainicio", "-idcursorealizado") if "cursos" in secciones else [],
+
+        "recon": activos(perfil.reconocimientos, "-fechareconocimiento", "-idreconocimiento") if "recon" in secciones else [],
+
+        "pa": activos(perfil.productos_academicos, "-idproductoacademico") if "pa" in secciones else [],
+
+        "pl": activos(perfil.productos_laborales, "-fechaproducto", "-idproductolaboral") if "pl" in secciones else [],
+
+        "vg": activos(perfil.venta_garage, "-fecha", "-idventagarage") if "vg" in secciones else [],
+
+    }
+
+
+
+# =========================
+
+# PDF (ReportLab)
+
+# =========================
+
+# Grid de imágenes normales (fotos de productos): columnas por fila
+
+GRID_COLUMNAS = 3
+
+
+
+def generar_pdf(perfil, secciones, destino, calidad=CALIDAD_DEFAULT, prefetch_timeout=None):
+
+    """
+
+    Dibuja la hoja de vida del perfil y la escribe en `destino` (cualquier archivo binario).
+
+    `secciones` es la tupla normalizada de checks del modal (ver cache.normalizar_secciones)
+
+    y `calidad` uno de cache.CALIDADES_PDF.
+
+    Devuelve False si el PDF salió incompleto (blobs que no se pudieron bajar): sirve para esta
+
+    respuesta pero no se cachea ni se sirve con el mismo ETag que el completo. Las imágenes
+
+    achicadas por el presupuesto de memoria no cuentan: salen igual en cada render con el
+
+    mismo presupuesto, que va en las claves (cache._render).
+
+    `prefetch_timeout` reemplaza CV_PDF_PREFETCH_TIMEOUT (exportes sin nadie esperando).
+
+    """
+
+    # Los blobs se bajan a este directorio y se borran al terminar (aunque el dibujo falle).
+
+    # Una descarga abandonada por timeout puede seguir escribiendo: no frena la limpieza.
+
+    with tempfile.TemporaryDirectory(prefix="cv-pdf-", ignore_cleanup_errors=True) as spool:
+
+        return _dibujar_pdf(perfil, secciones, destino, calidad, spool, prefetch_timeout)
+
+
+
+def _dibujar_pdf(perfil, secciones, destino, calidad, spool, prefetch_timeout):
+
+    opciones = opciones_calidad(calidad)
+
+    dpi, jpeg = opciones["dpi"], opciones["jpeg"]
+
+    # Versiones de las secciones (claves de los fragmentos) antes que los datos: si un cambio
+
+    # entra en el medio, lo nuevo queda bajo la versión vieja (inofensivo) y no al revés
+
+    versiones = {codigo: get_version(perfil.pk, codigo) for codigo in secciones}
+
+    datos = _consultar_secciones(perfil, secciones)
+
+    exp_qs = datos["exp"]
+
+    cursos_qs = datos["cursos"]
+
+    rec_qs = datos["recon"]
+
+    pa_qs = datos["pa"]
+
+    pl_qs = datos["pl"]
+
+    vg_qs = datos["vg"]
+
+
+    # ============================
+
+    # Imágenes (según lo filtrado)
+
+    # ============================
+
+    # Calidad "texto": sin foto, certificados ni grid (no se baja nada del storage)
+
+    if opciones["imagenes"]:
+
+        cert_imgs, normal_imgs = _collect_images(perfil, cursos_qs, exp_qs, pa_qs, pl_qs, rec_qs)
+
+        cert_pdfs = _collect_pdfs(cursos_qs, exp_qs, pa_qs, pl_qs, rec_qs)
+
+    else:
+
+        cert_imgs, normal_imgs, cert_pdfs = [], [], []
+
+
+    W, H = A4
+
+
+    # Colores
+
+    navy = colors.HexColor("#0b2a57")
+
+    navy2 = colors.HexColor("#0a2347")
+
+    white = colors.white
+
+    text = colors.HexColor("#0f172a")
+
+    muted = colors.HexColor("#475569")
+
+    border = colors.HexColor("#dbe4f5")
+
+    chip = colors.HexColor("#e9f0ff")
+
+
+    # Layout
+
+    margin = 1.2 * cm
+
+    sidebar_w = 5.7 * cm
+
+    gap = 0.8 * cm
+
+
+    sidebar_w_total = margin + sidebar_w + gap / 2
+
+    content_x = margin + sidebar_w + gap
+
+    content_w = W - content_x - margin
+
+
+    # Grid de imágenes: celda = miniatura (4:3) + pie de 2 líneas
+
+    grid_gutter = 0.5 * cm
+
+    grid_cell_w = (W - 2 * margin - (GRID_COLUMNAS - 1) * grid_gutter) / GRID_COLUMNAS
+
+    grid_img_h = grid_cell_w * 0.75
+
+    grid_caption_h = 0.9 * cm
+
+
+    # ============================
+
+    # Fragmentos de página completa
+
+    # ============================
+
+    # Los certificados de cada sección y el grid de imágenes van en páginas propias: se dibujan
+
+    # como PDFs aparte, cacheados por la versión de su(s) sección(es). Cambiar un check o editar
+
+    # un ítem solo redibuja lo de esa sección; las fichas de texto comparten páginas entre
+
+    # secciones y se dibujan siempre (son lo barato: sin imágenes).
+
+    fragmentos = []
+
+    por_seccion = {}
+
+    for ev in cert_imgs:
+
+        por_seccion.setdefault(ev["codigo"], []).append(ev)
+
+    for codigo, items in por_seccion.items():
+
+        key = fragmento_key(perfil.pk, f"cert-{codigo}", [versiones[codigo]], calidad)
+
+        fragmentos.append({"key": key, "tipo": "certificados", "items": items})
+
+    if normal_imgs:
+
+        codigos = list(dict.fromkeys(ev["codigo"] for ev in normal_imgs))
+
+        key = fragmento_key(perfil.pk, "grid-" + "-".join(codigos), [versiones[cod] for cod in codigos], calidad)
+
+        fragmentos.append({"key": key, "tipo": "grid", "items": normal_imgs})
+
+
+    hechos = cache.get_many([f["key"] for f in fragmentos])
+
+    pendientes = [f for f in fragmentos if f["key"] not in hechos]
+
+    cert_pendientes = [ev for f in pendientes if f["tipo"] == "certificados" for ev in f["items"]]
+
+    grid_pendiente = [ev for f in pendientes if f["tipo"] == "grid" for ev in f["items"]]
+
+
+    # Miniaturas ya reducidas en otra impresión: salen de la caché sin bajar la imagen original
+
+    miniaturas = miniaturas_cacheadas([ev["field"].name for ev in grid_pendiente], grid_cell_w, grid_img_h, dpi, jpeg)
+
+
+    # Todo lo que se va a usar se baja antes y en paralelo; el dibujo solo usa bytes en memoria.
+
+    # Los PDFs de certificado que ya están en la caché no se vuelven a bajar, ni las imágenes
+
+    # de fragmentos que ya están en la caché.
+
+    pdfs_cacheados = _certificados_cacheados([f.name for f in cert_pdfs])
+
+    blobs, fallidos = _prefetch_blobs(
+
+        ([perfil.foto_perfil] if opciones["imagenes"] else [])
+
+        + [ev["field"] for ev in cert_pendientes]
+
+        + [ev["field"] for ev in grid_pendiente if ev["field"].name not in miniaturas]
+
+        + [f for f in cert_pdfs if f.name not in pdfs_cacheados],
+
+        spool,
+
+        prefetch_timeout,
+
+    )
+
+
+    # Memoria para imágenes de este render; si no alcanza se bajan los DPI de las que faltan.
+
+    # PdfReader lee entero cada PDF de certificado al anexarlo: eso se descuenta desde el inicio.
+
+    presupuesto = PresupuestoImagenes(settings.CV_PDF_MEMORY_BUDGET_MB * 1024 * 1024)
+
+    presupuesto.consumir(
+
+        sum(len(data) for data in pdfs_cacheados.values())
+
+        + sum(os.path.getsize(blobs[f.name]) for f in cert_pdfs if f.name in blobs)
+
+    )
+
+
+    FONT, FONT_B = registrar_fuentes()
+
+
+    # Con fragmentos o PDFs para anexar, ReportLab dibuja aparte y PyPDF2 escribe el resultado en `destino`
+
+    lienzo = io.BytesIO() if (fragmentos or cert_pdfs) else destino
+
+    # invariant: sin fecha de creación ni /ID aleatorio, el mismo contenido da los mismos bytes (ETag)
+
+    c = canvas.Canvas(lienzo, pagesize=A4, invariant=1)
+
+    c.setTitle("Hoja de vida")
+
+    c.setAuthor(f"{(perfil.nombres or '').strip()} {(perfil.apellidos or '').strip()}".strip())
+
+    c.setCreator("Hoja de vida")
+
+
+    lead_small = 12.5
+
+
+    # Un ImageReader por imagen distinta (hash), compartido entre todas las páginas que la muestran
+
+    lectores = {}
+
+
+    # La foto va en un círculo de 3.1 cm en cada página con sidebar: se reduce una sola vez
+
+    foto_reader = _reader_from_prefetch(blobs, perfil.foto_perfil, 3.1 * cm, 3.1 * cm, lectores, dpi, jpeg, presupuesto, fallidos)
+
+
+    def draw_sidebar_background():
+
+        c.setFillColor(navy)
+
+        c.rect(0, 0, sidebar_w_total, H, stroke=0, fill=1)
+
+
+    def draw_circle_image(image_reader, cx, cy, r):
+
+        c.saveState()
+
+        p = c.beginPath()
+
+        p.circle(cx, cy, r)
+
+        c.clipPath(p, stroke=0, fill=0)
+
+        c.drawImage(image_reader, cx - r, cy - r, width=2 * r, height=2 * r, preserveAspectRatio=True, mask="auto")
+
+        c.restoreState()
+
+
+    def hr_sidebar(y):
+
+        c.setStrokeColor(colors.HexColor("#2a4a7d"))
+
+        c.setLineWidth(1)
+
+        c.line(margin, y, margin + sidebar_w - 0.2 * cm, y)
+
+
+    def draw_sidebar_content():
+
+        top_y = H - margin - 0.4 * cm
+
+
+        if foto_reader:
+
+            try:
+
+                draw_circle_image(foto_reader, margin + 2.0 * cm, top_y - 1.85 * cm, 1.55 * cm)
+
+            except Exception:
+
+                pass
+
+
+        nombre = f"{(perfil.nombres or '').strip()} {(perfil.apellidos or '').strip()}".strip() or "Perfil"
+
+        c.setFillColor(white)
+
+        c.setFont(FONT_B, 14.2)
+
+        c.drawString(margin, top_y - 4.05 * cm, nombre[:28])
+
+
+        desc_local = _clean(perfil.descripcionperfil)
+
+        if desc_local:
+
+            c.setFillColor(colors.HexColor("#d7e6ff"))
+
+            c.setFont(FONT, 9.6)
+
+            _draw_wrapped(c, desc_local, margin, top_y - 4.65 * cm, sidebar_w - 0.2 * cm, FONT, 9.6, 12)
+
+
+        yL = top_y - 5.9 * cm
+
+        hr_sidebar(yL + 0.45 * cm)
+
+        c.setFillColor(colors.HexColor("#d7e6ff"))
+
+        c.setFont(FONT_B, 10)
+
+        c.drawString(margin, yL, "DATOS PERSONALES")
+
+        yL -= 0.65 * cm
+
+
+        dp_pairs = _pairs_from_fields([
+
+            ("Cédula", perfil.numerocedula),
+
+            ("Sexo", perfil.sexo),
+
+            ("Estado civil", perfil.estadocivil),
+
+            ("Fecha nac.", perfil.fechanacimiento),
+
+            ("Nacionalidad", perfil.nacionalidad),
+
+            ("Lugar nac.", perfil.lugarnacimiento),
+
+            ("Licencia", perfil.licenciaconducir),
+
+            ("Teléfono", perfil.telefonofijo),
+
+            ("Convencional", perfil.telefonoconvencional),
+
+            ("Dirección dom.", perfil.direcciondomiciliaria),
+
+            ("Dirección trab.", perfil.direcciontrabajo),
+
+            ("Sitio web", perfil.sitioweb),
+
+        ])
+
+
+        for label, val in dp_pairs:
+
+            c.setFillColor(colors.HexColor("#d7e6ff"))
+
+            c.setFont(FONT_B, 9.1)
+
+            c.drawString(margin, yL, f"{label}:")
+
+            yL -= 0.35 * cm
+
+            c.setFillColor(white)
+
+            c.setFont(FONT, 9.5)
+
+            yL = _draw_wrapped(c, val, margin, yL, sidebar_w - 0.2 * cm, FONT, 9.5, 11.5)
+
+            yL -= 0.2 * cm
+
+            if yL < 1.6 * cm:
+
+                break
+
+
+    # ========== Partes fijas como Form XObjects ==========
+
+    # Sidebar (fondo, foto, datos) y la barra de título de las hojas completas (form_barra_titulo,
+
+    # en cada fragmento) son iguales en todas las páginas: se dibujan una sola vez y cada página
+
+    # solo las referencia.
+
+    c.beginForm("sidebar")
+
+    draw_sidebar_background()
+
+    draw_sidebar_content()
+
+    c.endForm()
+
+
+    def new_page(with_sidebar=True):
+
+        c.showPage()
+
+        if with_sidebar:
+
+            c.doForm("sidebar")
+
+
+    def content_title(y, s):
+
+        c.setFillColor(text)
+
+        c.setFont(FONT_B, 13.8)
+
+        c.drawString(content_x, y, s)
+
+        c.setStrokeColor(border)
+
+        c.setLineWidth(1)
+
+        c.line(content_x, y - 0.25 * cm, content_x + content_w, y - 0.25 * cm)
+
+        return y - 0.85 * cm
+
+
+    def content_card(y, title_s, pairs, notes=None):
+
+        pairs = _pairs_from_fields(pairs)
+
+        notes = _clean(notes)
+
+
+        if not pairs and not notes:
+
+            return y
+
+
+        if y < 4.0 * cm:
+
+            new_page(with_sidebar=True)
+
+            y = H - margin - 0.6 * cm
+
+
+        inner_x = content_x
+
+        inner_w = content_w
+
+
+        c.setFillColor(navy2)
+
+        c.setFont(FONT_B, 11.6)
+
+        c.drawString(inner_x, y - 0.2 * cm, (title_s or "")[:92])
+
+
+        yy = y - 0.75 * cm
+
+
+        for label, val in pairs:
+
+            c.setFillColor(text)
+
+            c.setFont(FONT_B, 9.8)
+
+            c.drawString(inner_x, yy, f"{label}:")
+
+            c.setFillColor(muted)
+
+            c.setFont(FONT, 9.8)
+
+            yy = _draw_wrapped(c, val, inner_x + 3.25 * cm, yy, inner_w - 3.25 * cm, FONT, 9.8, lead_small)
+
+            yy -= 2
+
+
+            if yy < 2.2 * cm:
+
+                new_page(with_sidebar=True)
+
+                y = H - margin - 0.6 * cm
+
+                yy = y - 0.9 * cm
+
+
+        if notes:
+
+            yy -= 6
+
+            c.setFillColor(text)
+
+            c.setFont(FONT_B, 9.8)
+
+            c.drawString(inner_x, yy, "Descripción:")
+
+            yy -= lead_small
+
+            c.setFillColor(muted)
+
+            c.setFont(FONT, 9.8)
+
+            yy = _draw_wrapped(c, notes, inner_x, yy, inner_w, FONT, 9.8, lead_small)
+
+
+        yy -= 0.25 * cm
+
+        c.setStrokeColor(border)
+
+        c.setLineWidth(0.7)
+
+        c.line(content_x, yy, content_x + content_w, yy)
+
+
+        return yy - 0.45 * cm
+
+
+    # ========== Página CV ==========
+
+    c.doForm("sidebar")
+
+
+    desc = _clean(perfil.descripcionperfil)
+
+    yR = H - margin - 0.6 * cm
+
+
+    if desc:
+
+        yR = content_title(yR, "Perfil profesional")
+
+        yR = content_card(yR, "Resumen", [], desc)
+
+        yR -= 0.2 * cm
+
+
+    def section(title_name, items, draw_item):
+
+        nonlocal yR
+
+        if not items:
+
+            return
+
+
+        if yR < 4.0 * cm:
+
+            new_page(with_sidebar=True)
+
+            yR = H - margin - 0.6 * cm
+
+
+        yR = content_title(yR, title_name)
+
+
+        for it in items:
+
+            if yR < 3.2 * cm:
+
+                new_page(with_sidebar=True)
+
+                yR = H - margin - 0.6 * cm
+
+                yR = content_title(yR, title_name)
+
+
+            yR = draw_item(it)
+
+            yR -= 0.10 * cm
+
+
+        yR -= 0.25 * cm
+
+
+    section("Experiencia laboral", exp_qs, lambda it: content_card(
+
+        yR,
+
+        ((it.cargodesempenado or "Experiencia") + (f" — {it.nombrempresa}" if it.nombrempresa else "")).strip(),
+
+        [
+
+            ("Inicio", it.fechainicio),
+
+            ("Fin", it.fechafin),
+
+            ("Lugar", it.lugarempresa),
+
+            ("Dirección", it.direccionempresa),
+
+            ("Sitio web", it.sitiowebempresa),
+
+            ("Email", it.emailempresa),
+
+            ("Teléfono", it.telefonoempresa),
+
+            ("Contacto", it.nombrecontactoempresarial),
+
+            ("Tel. contacto", it.telefonocontactoempresarial),
+
+            ("Funciones", it.descripcionfunciones),
+
+        ],
+
+        it.responsabilidades
+
+    ))
+
+
+    section("Cursos realizados", cursos_qs, lambda it: content_card(
+
+        yR,
+
+        it.nombrecurso or "Curso",
+
+        [
+
+            ("Inicio", it.fechainicio),
+
+            ("Fin", it.fechafin),
+
+            ("Total horas", it.totalhoras),
+
+            ("Entidad", it.entidadpatrocinadora),
+
+            ("Contacto", it.nombrecontactoauspicia),
+
+            ("Tel. contacto", it.telefonocontactoauspicia),
+
+            ("Email entidad", it.emailempresapatrocinadora),
+
+        ],
+
+        it.descripcioncurso
+
+    ))
+
+
+    section("Productos académicos", pa_qs, lambda it: content_card(
+
+        yR,
+
+        it.nombreproducto or "Producto académico",
+
+        [("Clasificador", it.clasificador)],
+
+        it.descripcion
+
+    ))
+
+
+    section("Productos laborales", pl_qs, lambda it: content_card(
+
+        yR,
+
+        it.nombreproducto or "Producto laboral",
+
+        [("Fecha", it.fechaproducto)],
+
+        it.descripcion
+
+    ))
+
+
+    section("Reconocimientos", rec_qs, lambda it: content_card(
+
+        yR,
+
+        ((it.tiporeconocimiento or "Reconocimiento") + (f" — {it.entidadpatrocinadora}" if it.entidadpatrocinadora else "")).strip(),
+
+        [
+
+            ("Fecha", it.fechareconocimiento),
+
+            ("Tipo", it.tiporeconocimiento),
+
+            ("Entidad", it.entidadpatrocinadora),
+
+        ],
+
+        it.descripcionreconocimiento
+
+    ))
+
+
+    section("Venta garage", vg_qs, lambda it: content_card(
+
+        yR,
+
+        it.nombreproducto or "Producto",
+
+        [
+
+            ("Fecha", it.fecha),
+
+            ("Estado", it.estadoproducto),
+
+            ("Valor", f"${it.valordelbien}" if it.valordelbien is not None else ""),
+
+        ],
+
+        it.descripcion
+
+    ))
+
+
+    # ========== Fragmentos: certificados full page ==========
+
+    def form_barra_titulo(f):
+
+        f.beginForm("barra_titulo")
+
+        f.setFillColor(navy2)
+
+        f.rect(0, H - 2.0 * cm, W, 2.0 * cm, stroke=0, fill=1)
+
+        f.endForm()
+
+
+    def titulo_pagina(f, s, size):
+
+        f.doForm("barra_titulo")
+
+        f.setFillColor(white)
+
+        f.setFont(FONT_B, size)
+
+        f.drawString(margin, H - 1.3 * cm, s)
+
+
+    def paginas_certificados(f, items):
+
+        for ev in items:
+
+            titulo_pagina(f, f'{ev["section"]} | {ev["label"]}'[:100], 13.5)
+
+
+            img_reader = _reader_from_prefetch(blobs, ev["field"], W - 2*margin, H - 3*cm, lectores, dpi, jpeg, presupuesto, fallidos)
+
+            if img_reader:
+
+                try:
+
+                    f.drawImage(img_reader, margin, margin, W - 2*margin, H - 3*cm, preserveAspectRatio=True, mask="auto")
+
+                except Exception:
+
+                    pass
+
+            f.showPage()
+
+
+    # ========== Fragmentos: imágenes normales (grid de miniaturas) ==========
+
+    def thumb_reader(field):
+
+        key = ("miniatura", field.name)
+
+        if key not in lectores:
+
+            data = miniaturas.get(field.name)
+
+            if data is not None:
+
+                # Se descuenta igual que si se hubiera reducido ahora: el presupuesto (y con él
+
+                # qué imágenes se achican) no depende de lo que haya en la caché
+
+                presupuesto.consumir(len(data))
+
+            else:
+
+                ruta = blobs.get(field.name)
+
+                if ruta is None:
+
+                    fallidos.add(field.name)
+
+                    return None
+
+                data = miniatura(field.name, ruta, grid_cell_w, grid_img_h, dpi, jpeg, presupuesto)
+
+            lectores[key] = ImageReader(io.BytesIO(data))
+
+        return lectores[key]
+
+
+    def paginas_grid(f, items):
+
+        grid_top = H - 2.0 * cm - grid_gutter
+
+        fila_h = grid_img_h + grid_caption_h + grid_gutter
+
+        filas = max(1, int((grid_top - margin + grid_gutter) // fila_h))
+
+        por_pagina = GRID_COLUMNAS * filas
+
+
+        for i, ev in enumerate(items):
+
+            if i % por_pagina == 0:
+
+                if i:
+
+                    f.showPage()
+
+                titulo_pagina(f, "Imágenes" if i == 0 else "Imágenes (cont.)", 16)
+
+
+            fila, col = divmod(i % por_pagina, GRID_COLUMNAS)
+
+            x = margin + col * (grid_cell_w + grid_gutter)
+
+            y = grid_top - fila * fila_h - grid_img_h
+
+
+            f.setStrokeColor(border)
+
+            f.setLineWidth(0.8)
+
+            f.rect(x, y, grid_cell_w, grid_img_h, stroke=1, fill=0)
+
+
+            img_reader = thumb_reader(ev["field"])
+
+            if img_reader:
+
+                try:
+
+                    f.drawImage(img_reader, x, y, grid_cell_w, grid_img_h, preserveAspectRatio=True, anchor="c", mask="auto")
+
+                except Exception:
+
+                    pass
+
+
+            f.setFillColor(muted)
+
+            f.setFont(FONT, 8)
+
+            lineas = list(_wrap_lines(ev["label"], FONT, 8, grid_cell_w))
+
+            if len(lineas) > 2:
+
+                ultima = lineas[1]
+
+                while ultima and f.stringWidth(ultima + "…", FONT, 8) > grid_cell_w:
+
+                    ultima = ultima[:-1]
+
+                lineas = [lineas[0], ultima.rstrip() + "…"]
+
+            ty = y - 0.4 * cm
+
+            for ln in lineas:
+
+                f.drawString(x, ty, ln)
+
+                ty -= 10
+
+        f.showPage()
+
+
+    def dibujar_fragmento(frag):
+
+        usado = presupuesto.usado
+
+        buffer = io.BytesIO()
+
+        f = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+
+        form_barra_titulo(f)
+
+        if frag["tipo"] == "certificados":
+
+            paginas_certificados(f, frag["items"])
+
+        else:
+
+            paginas_grid(f, frag["items"])
+
+        f.save()
+
+        pdf = buffer.getvalue()
+
+        # Con imágenes que no se pudieron bajar no se cachea: la próxima vez sale completo.
+
+        # Se guarda lo que consumió del presupuesto para descontarlo igual cuando sale de la caché
+
+        completo = not any(ev["field"].name in fallidos for ev in frag["items"])
+
+        if completo:
+
+            cache.set(frag["key"], {"pdf": pdf, "usado": presupuesto.usado - usado}, settings.CV_PDF_CACHE_TIMEOUT)
+
+        return pdf
+
+
+    def parte(frag):
+
+        hecho = hechos.get(frag["key"])
+
+        if hecho is None:
+
+            return dibujar_fragmento(frag)
+
+        presupuesto.consumir(hecho["usado"])
+
+        return hecho["pdf"]
+
+
+    c.showPage()
+
+    c.save()
+
+
+    # ========== Ensamblado: fragmentos + PDFs de certificados ==========
+
+    if lienzo is not destino:
+
+        lienzo.seek(0)
+
+        partes = [parte(f) for f in fragmentos]
+
+        _ensamblar_pdf(lienzo, partes, cert_pdfs, blobs, pdfs_cacheados, destino, fallidos)
+
+
+    return not fallidos
+
+
+
+def obtener_pdf(perfil, secciones, calidad=CALIDAD_DEFAULT, version=None):
+
+    """
+
+    (pdf, completo): desde la caché si la versión de contenido no cambió; si no, se dibuja
+
+    y se guarda, salvo que haya salido incompleto (ver generar_pdf).
+
+    `version` (leída antes que los datos) sirve para saber bajo qué clave quedó guardado.
+
+    """
+
+    key = pdf_cache_key(perfil.pk, version or get_version(perfil.pk), secciones, calidad)
+
+    pdf = cache.get(key)
+
+    if pdf is not None:
+
+        return pdf, True
+
+
+    buffer = io.BytesIO()
+
+    completo = generar_pdf(perfil, secciones, buffer, calidad)
+
+    pdf = buffer.getvalue()
+
+    if completo:
+
+        cache.set(key, pdf, settings.CV_PDF_CACHE_TIMEOUT)
+
+    return pdf, completo
+
+
+
+def archivo_pdf(perfil, secciones, calidad=CALIDAD_DEFAULT):
+
+    """
+
+    Igual que obtener_pdf pero devuelve (archivo, completo), para FileResponse.
+
+    ReportLab solo escribe el documento en c.save() (la tabla xref va al final) y PdfWriter
+
+    arma todo en memoria al anexar fragmentos y certificados, así que el render pesa lo mismo
+
+    que en el modo normal. Lo que ahorra es después: el PDF terminado queda en un temporal
+
+    (en disco si supera CV_PDF_SPOOL_MAX_BYTES) y no en memoria del worker mientras dura la
+
+    descarga.
+
+    """
+
+    key = pdf_cache_key(perfil.pk, get_version(perfil.pk), secciones, calidad)
+
+    pdf = cache.get(key)
+
+    if pdf is not None:
+
+        return io.BytesIO(pdf), True
+
+
+    tmp = tempfile.SpooledTemporaryFile(max_size=settings.CV_PDF_SPOOL_MAX_BYTES)
+
+    try:
+
+        completo = generar_pdf(perfil, secciones, tmp, calidad)
+
+        if completo:
+
+            # La API de caché guarda valores, no archivos: se lee entero una vez, de cualquier
+
+            # tamaño, y se suelta antes de empezar a mandar
+
+            tmp.seek(0)
+
+            cache.set(key, tmp.read(), settings.CV_PDF_CACHE_TIMEOUT)
+
+        tmp.seek(0)
+
+    except BaseException:
+
+        tmp.close()
+
+        raise
+
+    return tmp, completo
+
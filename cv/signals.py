@@ -0,0 +1,116 @@
+from functools import partial
+
+
+from django.db import transaction
+
+from django.db.models.signals import post_delete, post_save
+
+from django.dispatch import receiver
+
+from django.utils import timezone
+
+
+from .cache import bump_version, bump_version_fila, invalidar_perfil_activo
+
+from .models import (
+
+    Datospersonales,
+
+    Cursosrealizados,
+
+    Experiencialaboral,
+
+    Productosacademicos,
+
+    Productoslaborales,
+
+    Reconocimientos,
+
+    Ventagarage,
+
+)
+
+
+
+# Modelo -> sección del PDF (checks del modal), para invalidar solo sus fragmentos
+
+# (también los de las páginas de sección: views._lista_seccion)
+
+MODELOS_HIJOS = {
+
+    Cursosrealizados: "cursos",
+
+    Experiencialaboral: "exp",
+
+    Productosacademicos: "pa",
+
+    Productoslaborales: "pl",
+
+    Reconocimientos: "recon",
+
+    Ventagarage: "vg",
+
+}
+
+
+
+# =========================
+
+# INVALIDACIÓN DE CACHÉ (PDF y fragmentos HTML)
+
+# =========================
+
+# Los signals corren dentro de la transacción del admin: las versiones se cambian recién en el
+
+# commit. Si no, un request en el medio leería la versión nueva con los datos viejos y los
+
+# dejaría cacheados con ella. Los valores se toman ya (después del delete el pk queda en None).
+
+@receiver([post_save, post_delete], sender=Datospersonales)
+
+def invalidar_perfil(sender, instance, **kwargs):
+
+    transaction.on_commit(partial(bump_version, instance.pk))
+
+
+
+@receiver(post_delete, sender=Datospersonales)
+
+def olvidar_perfil_activo(sender, instance, **kwargs):
+
+    # El save ya lo invalida (Datospersonales.save); el borrado no pasa por ahí
+
+    transaction.on_commit(invalidar_perfil_activo)
+
+
+
+def invalidar_hijo(sender, instance, **kwargs):
+
+    transaction.on_commit(partial(bump_version, instance.perfil_id, MODELOS_HIJOS[sender]))
+
+    # Solo la tarjeta de este registro se vuelve a renderizar
+
+    transaction.on_commit(partial(bump_version_fila, sender, instance.pk))
+
+
+
+def tocar_perfil(sender, instance, **kwargs):
+
+    # Borrar un registro no deja ningún updated_at más nuevo en la sección: se marca el perfil
+
+    # para que el Last-Modified de la página (views._estado_seccion) avance igual
+
+    Datospersonales.objects.filter(pk=instance.perfil_id).update(updated_at=timezone.now())
+
+    transaction.on_commit(invalidar_perfil_activo)
+
+
+
+for modelo in MODELOS_HIJOS:
+
+    post_save.connect(invalidar_hijo, sender=modelo)
+
+    post_delete.connect(invalidar_hijo, sender=modelo)
+
+    post_delete.connect(tocar_perfil, sender=modelo)
+
@@ -0,0 +1,98 @@
+import os
+
+import time
+
+
+import django
+
+
+
+# =========================
+
+# TAREAS PARA POOLS DE PROCESOS
+
+# =========================
+
+# Los pools usan "spawn": este módulo se importa en cada proceso hijo ANTES de django.setup(),
+
+# por eso los modelos y el render se importan dentro de cada función.
+
+def iniciar_worker():
+
+    django.setup()
+
+
+    from .fuentes import registrar_fuentes
+
+
+    registrar_fuentes()
+
+
+
+def precalentar_variante(perfil_id, secciones):
+
+    from .models import Datospersonales
+
+    from .pdf import obtener_pdf
+
+
+    inicio = time.perf_counter()
+
+    perfil = Datospersonales.objects.get(pk=perfil_id)
+
+    pdf, _ = obtener_pdf(perfil, secciones)
+
+    return secciones, len(pdf), time.perf_counter() - inicio
+
+
+
+def exportar_perfil(perfil_id, secciones, calidad, directorio, prefetch_timeout=None):
+
+    """
+
+    Escribe el PDF del perfil en `directorio` con el mismo render que /imprimir/,
+
+    directo al archivo (sin pasar por la caché ni tener el PDF entero en memoria).
+
+    Devuelve también si salió completo (ver generar_pdf).
+
+    """
+
+    from django.utils.text import slugify
+
+
+    from .models import Datospersonales
+
+    from .pdf import generar_pdf
+
+
+    inicio = time.perf_counter()
+
+    perfil = Datospersonales.objects.get(pk=perfil_id)
+
+    nombre = f"hoja_de_vida_{perfil.pk}_{slugify(f'{perfil.apellidos} {perfil.nombres}')}.pdf"
+
+    ruta = os.path.join(directorio, nombre)
+
+
+    # Se escribe con otro nombre y se renombra: nunca queda un PDF a medias con el nombre final
+
+    parcial = ruta + ".parcial"
+
+    try:
+
+        with open(parcial, "wb") as fh:
+
+            completo = generar_pdf(perfil, secciones, fh, calidad, prefetch_timeout)
+
+        os.replace(parcial, ruta)
+
+    finally:
+
+        if os.path.exists(parcial):
+
+            os.remove(parcial)
+
+
+    return perfil_id, ruta, os.path.getsize(ruta), time.perf_counter() - inicio, completo
+
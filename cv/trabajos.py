@@ -0,0 +1,325 @@
+import threading
+
+import time
+
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+from django.conf import settings
+
+from django.core.cache import cache
+
+from django.db import close_old_connections
+
+
+from .cache import CALIDAD_DEFAULT, get_version, pdf_cache_key
+
+from .models import Datospersonales
+
+from .pdf import obtener_pdf
+
+
+
+# =========================
+
+# TRABAJOS DE PDF EN SEGUNDO PLANO
+
+# =========================
+
+# Sin broker: cada worker de gunicorn tiene su propio pool de hilos.
+
+# El estado va a la caché compartida, así cualquier worker puede responder el polling
+
+# y la descarga sale de la misma entrada que usa obtener_pdf.
+
+PENDIENTE = "pendiente"
+
+PROCESANDO = "procesando"
+
+LISTO = "listo"
+
+ERROR = "error"
+
+
+_executor = None
+
+_executor_lock = threading.Lock()
+
+
+# Trabajos en la cola de este proceso (pendientes o dibujándose)
+
+_en_cola = 0
+
+
+
+def _get_executor():
+
+    # Se crea en el primer uso, ya dentro del worker (después del fork de gunicorn)
+
+    global _executor
+
+    with _executor_lock:
+
+        if _executor is None:
+
+            _executor = ThreadPoolExecutor(max_workers=settings.CV_PDF_JOB_WORKERS, thread_name_prefix="cv-pdf")
+
+        return _executor
+
+
+
+def _trabajo_key(trabajo_id):
+
+    return f"cv:pdf-job:{trabajo_id}"
+
+
+
+def _pdf_trabajo_key(trabajo_id):
+
+    # Lo que dibujó el trabajo, completo o no: la descarga no vuelve a dibujar
+
+    return f"cv:pdf-job-pdf:{trabajo_id}"
+
+
+
+def _en_curso_key(variante_key):
+
+    # Trabajo que ya está dibujando esa variante: los pedidos iguales se suman a ese
+
+    return f"cv:pdf-job-en-curso:{variante_key}"
+
+
+
+def get_trabajo(trabajo_id):
+
+    trabajo = cache.get(_trabajo_key(trabajo_id))
+
+    # Un trabajo que no termina a tiempo se da por perdido (p. ej. se reinició el worker que
+
+    # lo tenía en su pool): el polling deja de esperar y la variante se puede volver a pedir
+
+    if (
+
+        trabajo is not None
+
+        and trabajo["estado"] in (PENDIENTE, PROCESANDO)
+
+        and time.time() - trabajo["creado"] > settings.CV_PDF_JOB_MAX_SEGUNDOS
+
+    ):
+
+        trabajo["estado"] = ERROR
+
+        trabajo["terminado"] = time.time()
+
+        trabajo["error"] = "El PDF no terminó a tiempo"
+
+        _guardar(trabajo)
+
+        if cache.get(trabajo["en_curso_key"]) == trabajo["id"]:
+
+            cache.delete(trabajo["en_curso_key"])
+
+    return trabajo
+
+
+
+def _guardar(trabajo):
+
+    cache.set(_trabajo_key(trabajo["id"]), trabajo, settings.CV_PDF_JOB_TIMEOUT)
+
+
+
+def encolar_pdf(perfil, secciones, calidad=CALIDAD_DEFAULT):
+
+    """
+
+    Crea el trabajo y lo manda al pool. Si esa variante ya está en caché queda listo de una;
+
+    si ya hay un trabajo en curso para ella se devuelve ese. None si la cola de este proceso
+
+    está llena (CV_PDF_JOB_MAX_COLA).
+
+    """
+
+    global _en_cola
+
+    version = get_version(perfil.pk)
+
+    trabajo = {
+
+        "id": uuid.uuid4().hex,
+
+        "perfil": perfil.pk,
+
+        "version": version,
+
+        "secciones": list(secciones),
+
+        "calidad": calidad,
+
+        "estado": PENDIENTE,
+
+        "creado": time.time(),
+
+        "terminado": None,
+
+        "completo": True,
+
+        "error": None,
+
+    }
+
+
+    variante_key = pdf_cache_key(perfil.pk, version, secciones, calidad)
+
+    if cache.has_key(variante_key):
+
+        trabajo["estado"] = LISTO
+
+        trabajo["terminado"] = trabajo["creado"]
+
+        _guardar(trabajo)
+
+        return trabajo
+
+
+    en_curso_key = _en_curso_key(variante_key)
+
+    if not cache.add(en_curso_key, trabajo["id"], settings.CV_PDF_JOB_TIMEOUT):
+
+        otro = get_trabajo(cache.get(en_curso_key))
+
+        if otro is not None and otro["estado"] in (PENDIENTE, PROCESANDO):
+
+            return otro
+
+
+    with _executor_lock:
+
+        if _en_cola >= settings.CV_PDF_JOB_MAX_COLA:
+
+            cache.delete(en_curso_key)
+
+            return None
+
+        _en_cola += 1
+
+
+    trabajo["en_curso_key"] = en_curso_key
+
+    # Si el add falló por un trabajo ya terminado (o vencido), este pasa a ser el de la variante
+
+    cache.set(en_curso_key, trabajo["id"], settings.CV_PDF_JOB_TIMEOUT)
+
+    _guardar(trabajo)
+
+    _get_executor().submit(_ejecutar, trabajo["id"])
+
+    return trabajo
+
+
+
+def _ejecutar(trabajo_id):
+
+    global _en_cola
+
+    try:
+
+        _dibujar_trabajo(trabajo_id)
+
+    finally:
+
+        with _executor_lock:
+
+            _en_cola -= 1
+
+
+
+def _dibujar_trabajo(trabajo_id):
+
+    trabajo = get_trabajo(trabajo_id)
+
+    if trabajo is None:
+
+        return
+
+
+    trabajo["estado"] = PROCESANDO
+
+    _guardar(trabajo)
+
+
+    # El hilo abre su propia conexión a la base: se cierra al terminar
+
+    close_old_connections()
+
+    try:
+
+        perfil = Datospersonales.objects.get(pk=trabajo["perfil"])
+
+        # Si hubo cambios mientras esperaba en la cola se dibuja la versión nueva: se anota
+
+        # para que la descarga encuentre el PDF bajo la misma clave
+
+        trabajo["version"] = get_version(perfil.pk)
+
+        pdf, trabajo["completo"] = obtener_pdf(perfil, tuple(trabajo["secciones"]), trabajo["calidad"], trabajo["version"])
+
+        cache.set(_pdf_trabajo_key(trabajo_id), pdf, settings.CV_PDF_JOB_TIMEOUT)
+
+        trabajo["estado"] = LISTO
+
+    except Exception as exc:
+
+        trabajo["estado"] = ERROR
+
+        trabajo["error"] = str(exc) or exc.__class__.__name__
+
+    finally:
+
+        close_old_connections()
+
+
+    trabajo["terminado"] = time.time()
+
+    _guardar(trabajo)
+
+    # Los pedidos siguientes de la variante ya no se suman a este
+
+    if cache.get(trabajo["en_curso_key"]) == trabajo_id:
+
+        cache.delete(trabajo["en_curso_key"])
+
+
+
+def pdf_de_trabajo(trabajo, perfil):
+
+    """
+
+    (pdf, completo) de un trabajo listo: lo que dibujó el propio trabajo o, si quedó listo al
+
+    encolar, la variante cacheada. Si las dos entradas se perdieron de la caché se dibuja de
+
+    nuevo con la versión actual.
+
+    """
+
+    pdf = cache.get(_pdf_trabajo_key(trabajo["id"]))
+
+    if pdf is not None:
+
+        return pdf, trabajo.get("completo", True)
+
+    secciones = tuple(trabajo["secciones"])
+
+    pdf = cache.get(pdf_cache_key(trabajo["perfil"], trabajo["version"], secciones, trabajo["calidad"]))
+
+    if pdf is not None:
+
+        return pdf, True
+
+    return obtener_pdf(perfil, secciones, trabajo["calidad"])
+
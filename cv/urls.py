@@ -29,4 +29,15 @@ urlpatterns = [
 
     path("imprimir/", views.imprimir_hoja_vida, name="imprimir_hoja_vida"),
 
+    path("imprimir/estado/", views.estado_pdf, name="estado_pdf"),
+
+
+    # PDF en segundo plano: encolar (POST) -> estado (polling) -> descarga
+
+    path("imprimir/trabajos/", views.encolar_trabajo_pdf, name="encolar_trabajo_pdf"),
+
+    path("imprimir/trabajos/<str:trabajo_id>/", views.estado_trabajo_pdf, name="estado_trabajo_pdf"),
+
+    path("imprimir/trabajos/<str:trabajo_id>/pdf/", views.descargar_trabajo_pdf, name="descargar_trabajo_pdf"),
+
 ]
\ No newline at end of file
@@ -1,1133 +1,68 @@
-import io
+import base64
 
-import os
+import hashlib
 
+import json
 
-from django.http import HttpResponse, HttpResponseForbidden
+import time
 
-from django.shortcuts import render
-
-
-from reportlab.lib.pagesizes import A4
-
-from reportlab.lib.units import cm
-
-from reportlab.lib import colors
-
-from reportlab.pdfgen import canvas
-
-from reportlab.lib.utils import ImageReader, simpleSplit
-
-
-from reportlab.pdfbase import pdfmetrics
-
-from reportlab.pdfbase.ttfonts import TTFont
-
-
-from .models import (
-
-    Datospersonales,
-
-    Cursosrealizados,
-
-    Experiencialaboral,
-
-    Productosacademicos,
-
-    Productoslaborales,
-
-    Reconocimientos,
-
-    Ventagarage,
-
-)
-
-
-
-# =========================
-
-# Helpers
-
-# =========================
-
-def _get_perfil_activo():
-
-    # SOLO perfil activo. Si no hay, devuelve None (y el front no debe mostrar nada).
-
-    return Datospersonales.objects.filter(perfilactivo=True).order_by("-idperfil").first()
-
-
-
-def _image_reader_from_field(image_field):
-
-    image_field.open("rb")
-
-    try:
-
-        data = image_field.read()
-
-    finally:
-
-        try:
-
-            image_field.close()
-
-        except Exception:
-
-            pass
-
-    return ImageReader(io.BytesIO(data))
-
-
-
-def _register_pretty_fonts():
-
-    font_regular = "Helvetica"
-
-    font_bold = "Helvetica-Bold"
-
-
-    candidates = [
-
-        (r"C:\Windows\Fonts\segoeui.ttf", r"C:\Windows\Fonts\segoeuib.ttf", "SegoeUI", "SegoeUI-Bold"),
-
-        (r"C:\Windows\Fonts\calibri.ttf", r"C:\Windows\Fonts\calibrib.ttf", "Calibri", "Calibri-Bold"),
-
-    ]
-
-    for reg_path, bold_path, reg_name, bold_name in candidates:
-
-        try:
-
-            if os.path.exists(reg_path) and os.path.exists(bold_path):
-
-                pdfmetrics.registerFont(TTFont(reg_name, reg_path))
-
-                pdfmetrics.registerFont(TTFont(bold_name, bold_path))
-
-                font_regular = reg_name
-
-                font_bold = bold_name
-
-                break
-
-        except Exception:
-
-            continue
-
-
-    return font_regular, font_bold
-
-
-
-def _clean(value):
-
-    if value is None:
-
-        return ""
-
-    if isinstance(value, str):
-
-        return value.strip()
-
-    return str(value)
-
-
-
-def _draw_wrapped(c, text, x, y, max_width, font_name, font_size, leading):
-
-    if not text or not str(text).strip():
-
-        return y
-
-    lines = simpleSplit(str(text), font_name, font_size, max_width)
-
-    for ln in lines:
-
-        c.drawString(x, y, ln)
-
-        y -= leading
-
-    return y
-
-
-
-def _pairs_from_fields(pairs):
-
-    out = []
-
-    for label, val in pairs:
-
-        val = _clean(val)
-
-        if val:
-
-            out.append((label, val))
-
-    return out
-
-
-
-def _collect_images(perfil, cursos, experiencias, prod_acad, prod_lab, reconoc):
-
-    """
-
-    certificados: imágenes tipo certificado (una por hoja)
-
-    normales: imágenes tipo "foto del producto" (en grid)
-
-    """
-
-    certificados = []
-
-    normales = []
-
-
-    def add_cert(section, label, field):
-
-        if field and getattr(field, "name", None):
-
-            certificados.append({"section": section, "label": label, "field": field})
-
-
-    def add_normal(section, label, field, kind="Imagen"):
-
-        if field and getattr(field, "name", None):
-
-            normales.append({"section": section, "label": f"{label} — {kind}", "field": field})
-
-
-    for c_ in cursos:
-
-        base = f'Curso "{c_.nombrecurso or "Sin título"}"'
-
-        add_cert("Cursos", base, c_.certificado_imagen)
-
-
-    for e in experiencias:
-
-        cargo = e.cargodesempenado or "Sin título"
-
-        emp = f" - {e.nombrempresa}" if e.nombrempresa else ""
-
-        base = f'Experiencia "{cargo}{emp}"'
-
-        add_cert("Experiencia laboral", base, e.certificado_imagen)
-
-
-    for p in prod_acad:
-
-        base = f'Producto académico "{p.nombreproducto or "Sin título"}"'
-
-        add_normal("Productos académicos", base, p.imagenproducto, "Imagen del producto")
-
-        add_cert("Productos académicos", base, p.certificado_imagen)
-
-
-    for p in prod_lab:
-
-        base = f'Producto laboral "{p.nombreproducto or "Sin título"}"'
-
-        add_normal("Productos laborales", base, p.imagenproducto, "Imagen del producto")
-
-        add_cert("Productos laborales", base, p.certificado_imagen)
-
-
-    # ✅ FIX: en tu modelo el campo es entidadpatrocinadora
-
-    for r in reconoc:
-
-        tipo = r.tiporeconocimiento or "Reconocimiento"
-
-        ent = f" - {r.entidadpatrocinadora}" if r.entidadpatrocinadora else ""
-
-        base = f'Reconocimiento "{tipo}{ent}"'
-
-        add_cert("Reconocimientos", base, r.certificado_imagen)
-
-
-    return certificados, normales
-
-
-
-# =========================
-
-# Views web
-
-# =========================
-
-def home(request):
-
-    perfil = _get_perfil_activo()
-
-    permitir_impresion = bool(perfil and perfil.permitir_impresion)
-
-
-    counts = {
-
-        "cursos": perfil.cursos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "experiencias": perfil.experiencias.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "prod_acad": perfil.productos_academicos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "prod_lab": perfil.productos_laborales.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "reconoc": perfil.reconocimientos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "venta": perfil.venta_garage.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-    }
-
-
-    return render(request, "home.html", {
-
-        "perfil": perfil,
-
-        "permitir_impresion": permitir_impresion,
-
-        "counts": counts,
-
-    })
-
-
-
-def datos_personales(request):
-
-    perfil = _get_perfil_activo()
-
-    return render(request, "secciones/datos_personales.html", {"perfil": perfil})
-
-
-
-def cursos(request):
-
-    perfil = _get_perfil_activo()
-
-    items = (
-
-        perfil.cursos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechafin", "-fechainicio", "-idcursorealizado")
-
-        if perfil else []
-
-    )
-
-    return render(request, "secciones/cursos.html", {"perfil": perfil, "items": items})
-
-
-
-def experiencia(request):
-
-    perfil = _get_perfil_activo()
-
-    items = (
-
-        perfil.experiencias
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechafin", "-fechainicio", "-idexperiencialaboral")
-
-        if perfil else []
-
-    )
-
-    return render(request, "secciones/experiencia.html", {"perfil": perfil, "items": items})
-
-
-
-def productos_academicos(request):
-
-    perfil = _get_perfil_activo()
-
-    # no tiene fecha, lo dejamos por id
-
-    items = (
-
-        perfil.productos_academicos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-idproductoacademico")
-
-        if perfil else []
-
-    )
-
-    return render(request, "secciones/productos_academicos.html", {"perfil": perfil, "items": items})
-
-
-
-def productos_laborales(request):
-
-    perfil = _get_perfil_activo()
-
-    items = (
-
-        perfil.productos_laborales
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechaproducto", "-idproductolaboral")
-
-        if perfil else []
-
-    )
-
-    return render(request, "secciones/productos_laborales.html", {"perfil": perfil, "items": items})
-
-
-
-def reconocimientos(request):
-
-    perfil = _get_perfil_activo()
-
-    items = (
-
-        perfil.reconocimientos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechareconocimiento", "-idreconocimiento")
-
-        if perfil else []
-
-    )
-
-    return render(request, "secciones/reconocimientos.html", {"perfil": perfil, "items": items})
-
-
-
-def venta_garage(request):
-
-    perfil = _get_perfil_activo()
-
-    items = (
-
-        perfil.venta_garage
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fecha", "-idventagarage")
-
-        if perfil else []
-
-    )
-
-    return render(request, "secciones/venta_garage.html", {"perfil": perfil, "items": items})
-
-
-
-# =========================
-
-# PDF (ReportLab)
-
-# =========================
-
-def imprimir_hoja_vida(request):
-
-    perfil = _get_perfil_activo()
-
-
-    if not perfil:
-
-        return HttpResponse("Perfil no encontrado", status=404)
-
-
-    if not perfil.permitir_impresion:
-
-        return HttpResponseForbidden("No autorizado", status=403)
-
-
-    # ============================
-
-    # Consultas base
-
-    # ============================
-
-    cursos_qs = list(
-
-        perfil.cursos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechafin", "-fechainicio", "-idcursorealizado")
-
-    )
-
-    exp_qs = list(
-
-        perfil.experiencias
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechafin", "-fechainicio", "-idexperiencialaboral")
-
-    )
-
-    rec_qs = list(
-
-        perfil.reconocimientos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechareconocimiento", "-idreconocimiento")
-
-    )
-
-    pa_qs = list(
-
-        perfil.productos_academicos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-idproductoacademico")
-
-    )
-
-    pl_qs = list(
-
-        perfil.productos_laborales
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechaproducto", "-idproductolaboral")
-
-    )
-
-    vg_qs = list(
-
-        perfil.venta_garage
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fecha", "-idventagarage")
-
-    )
-
-
-    # ============================
-
-    # FILTRO DESDE MODAL (checks)
-
-    # ============================
-
-    filtros = {"exp", "cursos", "recon", "pa", "pl", "vg"}
-
-    hay_filtro = any(k in request.GET for k in filtros)
-
-
-    if hay_filtro:
-
-        if "exp" not in request.GET:
-
-            exp_qs = []
-
-        if "cursos" not in request.GET:
-
-            cursos_qs = []
-
-        if "recon" not in request.GET:
-
-            rec_qs = []
-
-        if "pa" not in request.GET:
-
-            pa_qs = []
-
-        if "pl" not in request.GET:
-
-            pl_qs = []
-
-        if "vg" not in request.GET:
-
-            vg_qs = []
-
-
-    # ============================
-
-    # Imágenes (según lo filtrado)
-
-    # ============================
-
-    cert_imgs, normal_imgs = _collect_images(perfil, cursos_qs, exp_qs, pa_qs, pl_qs, rec_qs)
-
-
-    FONT, FONT_B = _register_pretty_fonts()
-
-
-    response = HttpResponse(content_type="application/pdf")
-
-    response["Content-Disposition"] = 'inline; filename="hoja_de_vida.pdf"'
-
-
-    c = canvas.Canvas(response, pagesize=A4)
-
-    W, H = A4
-
-
-    # Colores
-
-    navy = colors.HexColor("#0b2a57")
-
-    navy2 = colors.HexColor("#0a2347")
-
-    white = colors.white
-
-    text = colors.HexColor("#0f172a")
-
-    muted = colors.HexColor("#475569")
-
-    border = colors.HexColor("#dbe4f5")
-
-    chip = colors.HexColor("#e9f0ff")
-
-
-    # Layout
-
-    margin = 1.2 * cm
-
-    sidebar_w = 5.7 * cm
-
-    gap = 0.8 * cm
-
-
-    sidebar_w_total = margin + sidebar_w + gap / 2
-
-    content_x = margin + sidebar_w + gap
-
-    content_w = W - content_x - margin
-
-
-    lead_small = 12.5
-
-
-    def draw_sidebar_background():
-
-        c.setFillColor(navy)
-
-        c.rect(0, 0, sidebar_w_total, H, stroke=0, fill=1)
-
-
-    def draw_circle_image(image_reader, cx, cy, r):
-
-        c.saveState()
-
-        p = c.beginPath()
-
-        p.circle(cx, cy, r)
-
-        c.clipPath(p, stroke=0, fill=0)
-
-        c.drawImage(image_reader, cx - r, cy - r, width=2 * r, height=2 * r, preserveAspectRatio=True, mask="auto")
-
-        c.restoreState()
-
-
-    def hr_sidebar(y):
-
-        c.setStrokeColor(colors.HexColor("#2a4a7d"))
-
-        c.setLineWidth(1)
-
-        c.line(margin, y, margin + sidebar_w - 0.2 * cm, y)
-
-
-    def draw_sidebar_content():
-
-        top_y = H - margin - 0.4 * cm
-
-
-        if perfil.foto_perfil and getattr(perfil.foto_perfil, "name", None):
-
-            try:
-
-                img_reader = _image_reader_from_field(perfil.foto_perfil)
-
-                draw_circle_image(img_reader, margin + 2.0 * cm, top_y - 1.85 * cm, 1.55 * cm)
-
-            except Exception:
-
-                pass
-
-
-        nombre = f"{(perfil.nombres or '').strip()} {(perfil.apellidos or '').strip()}".strip() or "Perfil"
-
-        c.setFillColor(white)
-
-        c.setFont(FONT_B, 14.2)
-
-        c.drawString(margin, top_y - 4.05 * cm, nombre[:28])
-
-
-        desc_local = _clean(perfil.descripcionperfil)
-
-        if desc_local:
-
-            c.setFillColor(colors.HexColor("#d7e6ff"))
-
-            c.setFont(FONT, 9.6)
-
-            _draw_wrapped(c, desc_local, margin, top_y - 4.65 * cm, sidebar_w - 0.2 * cm, FONT, 9.6, 12)
-
-
-        yL = top_y - 5.9 * cm
-
-        hr_sidebar(yL + 0.45 * cm)
-
-        c.setFillColor(colors.HexColor("#d7e6ff"))
-
-        c.setFont(FONT_B, 10)
-
-        c.drawString(margin, yL, "DATOS PERSONALES")
-
-        yL -= 0.65 * cm
-
-
-        dp_pairs = _pairs_from_fields([
-
-            ("Cédula", perfil.numerocedula),
-
-            ("Sexo", perfil.sexo),
-
-            ("Estado civil", perfil.estadocivil),
-
-            ("Fecha nac.", perfil.fechanacimiento),
-
-            ("Nacionalidad", perfil.nacionalidad),
-
-            ("Lugar nac.", perfil.lugarnacimiento),
-
-            ("Licencia", perfil.licenciaconducir),
-
-            ("Teléfono", perfil.telefonofijo),
-
-            ("Convencional", perfil.telefonoconvencional),
-
-            ("Dirección dom.", perfil.direcciondomiciliaria),
-
-            ("Dirección trab.", perfil.direcciontrabajo),
-
-            ("Sitio web", perfil.sitioweb),
-
-        ])
-
-
-        for label, val in dp_pairs:
-
-            c.setFillColor(colors.HexColor("#d7e6ff"))
-
-            c.setFont(FONT_B, 9.1)
-
-            c.drawString(margin, yL, f"{label}:")
-
-            yL -= 0.35 * cm
-
-            c.setFillColor(white)
-
-            c.setFont(FONT, 9.5)
-
-            yL = _draw_wrapped(c, val, margin, yL, sidebar_w - 0.2 * cm, FONT, 9.5, 11.5)
-
-            yL -= 0.2 * cm
-
-            if yL < 1.6 * cm:
-
-                break
-
-
-    def new_page(with_sidebar=True):
-
-        c.showPage()
-
-        if with_sidebar:
-
-            draw_sidebar_background()
-
-            draw_sidebar_content()
-
-
-    def content_title(y, s):
-
-        c.setFillColor(text)
-
-        c.setFont(FONT_B, 13.8)
-
-        c.drawString(content_x, y, s)
-
-        c.setStrokeColor(border)
-
-        c.setLineWidth(1)
-
-        c.line(content_x, y - 0.25 * cm, content_x + content_w, y - 0.25 * cm)
-
-        return y - 0.85 * cm
-
-
-    def content_card(y, title_s, pairs, notes=None):
-
-        pairs = _pairs_from_fields(pairs)
-
-        notes = _clean(notes)
-
-
-        if not pairs and not notes:
-
-            return y
-
-
-        if y < 4.0 * cm:
-
-            new_page(with_sidebar=True)
-
-            y = H - margin - 0.6 * cm
-
-
-        inner_x = content_x
-
-        inner_w = content_w
-
-
-        c.setFillColor(navy2)
-
-        c.setFont(FONT_B, 11.6)
-
-        c.drawString(inner_x, y - 0.2 * cm, (title_s or "")[:92])
-
-
-        yy = y - 0.75 * cm
-
-
-        for label, val in pairs:
-
-            c.setFillColor(text)
-
-            c.setFont(FONT_B, 9.8)
-
-            c.drawString(inner_x, yy, f"{label}:")
-
-            c.setFillColor(muted)
-
-            c.setFont(FONT, 9.8)
-
-            yy = _draw_wrapped(c, val, inner_x + 3.25 * cm, yy, inner_w - 3.25 * cm, FONT, 9.8, lead_small)
-
-            yy -= 2
-
-
-            if yy < 2.2 * cm:
-
-                new_page(with_sidebar=True)
-
-                y = H - margin - 0.6 * cm
-
-                yy = y - 0.9 * cm
-
-
-        if notes:
-
-            yy -= 6
-
-            c.setFillColor(text)
-
-            c.setFont(FONT_B, 9.8)
-
-            c.drawString(inner_x, yy, "Descripción:")
-
-            yy -= lead_small
-
-            c.setFillColor(muted)
-
-            c.setFont(FONT, 9.8)
-
-            yy = _draw_wrapped(c, notes, inner_x, yy, inner_w, FONT, 9.8, lead_small)
-
-
-        yy -= 0.25 * cm
-
-        c.setStrokeColor(border)
-
-        c.setLineWidth(0.7)
-
-        c.line(content_x, yy, content_x + content_w, yy)
-
-
-        return yy - 0.45 * cm
-
-
-    # ========== Página CV ==========
-
-    draw_sidebar_background()
-
-    draw_sidebar_content()
-
-
-    desc = _clean(perfil.descripcionperfil)
-
-    yR = H - margin - 0.6 * cm
-
-
-    if desc:
-
-        yR = content_title(yR, "Perfil profesional")
-
-        yR = content_card(yR, "Resumen", [], desc)
-
-        yR -= 0.2 * cm
-
-
-    def section(title_name, items, draw_item):
-
-        nonlocal yR
-
-        if not items:
-
-            return
-
-
-        if yR < 4.0 * cm:
-
-            new_page(with_sidebar=True)
-
-            yR = H - margin - 0.6 * cm
-
-
-        yR = content_title(yR, title_name)
-
-
-        for it in items:
-
-            if yR < 3.2 * cm:
-
-                new_page(with_sidebar=True)
-
-                yR = H - margin - 0.6 * cm
-
-                yR = content_title(yR, title_name)
-
-
-            yR = draw_item(it)
-
-            yR -= 0.10 * cm
-
-
-        yR -= 0.25 * cm
-
-
-    section("Experiencia laboral", exp_qs, lambda it: content_card(
-
-        yR,
-
-        ((it.cargodesempenado or "Experiencia") + (f" — {it.nombrempresa}" if it.nombrempresa else "")).strip(),
-
-        [
-
-            ("Inicio", it.fechainicio),
-
-            ("Fin", it.fechafin),
-
-            ("Lugar", it.lugarempresa),
-
-            ("Dirección", it.direccionempresa),
-
-            ("Sitio web", it.sitiowebempresa),
+from functools import wraps
 
-            ("Email", it.emailempresa),
 
-            ("Teléfono", it.telefonoempresa),
+from django.conf import settings
 
-            ("Contacto", it.nombrecontactoempresarial),
+from django.contrib.admin.views.decorators import staff_member_required
 
-            ("Tel. contacto", it.telefonocontactoempresarial),
+from django.core import signing
 
-            ("Funciones", it.descripcionfunciones),
+from django.core.cache import cache
 
-        ],
+from django.db.models import Count, Max, OuterRef, Q, Subquery
 
-        it.responsabilidades
+from django.db.models.functions import Coalesce
 
-    ))
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, JsonResponse
 
+from django.middleware.csrf import get_token
 
-    section("Cursos realizados", cursos_qs, lambda it: content_card(
-
-        yR,
-
-        it.nombrecurso or "Curso",
-
-        [
-
-            ("Inicio", it.fechainicio),
-
-            ("Fin", it.fechafin),
-
-            ("Total horas", it.totalhoras),
-
-            ("Entidad", it.entidadpatrocinadora),
-
-            ("Contacto", it.nombrecontactoauspicia),
-
-            ("Tel. contacto", it.telefonocontactoauspicia),
-
-            ("Email entidad", it.emailempresapatrocinadora),
-
-        ],
-
-        it.descripcioncurso
-
-    ))
-
-
-    section("Productos académicos", pa_qs, lambda it: content_card(
-
-        yR,
-
-        it.nombreproducto or "Producto académico",
-
-        [("Clasificador", it.clasificador)],
-
-        it.descripcion
-
-    ))
-
-
-    section("Productos laborales", pl_qs, lambda it: content_card(
-
-        yR,
-
-        it.nombreproducto or "Producto laboral",
-
-        [("Fecha", it.fechaproducto)],
-
-        it.descripcion
-
-    ))
-
-
-    section("Reconocimientos", rec_qs, lambda it: content_card(
-
-        yR,
-
-        ((it.tiporeconocimiento or "Reconocimiento") + (f" — {it.entidadpatrocinadora}" if it.entidadpatrocinadora else "")).strip(),
-
-        [
-
-            ("Fecha", it.fechareconocimiento),
-
-            ("Tipo", it.tiporeconocimiento),
-
-            ("Entidad", it.entidadpatrocinadora),
-
-        ],
-
-        it.descripcionreconocimiento
-
-    ))
-
-
-    section("Venta garage", vg_qs, lambda it: content_card(
-
-        yR,
-
-        it.nombreproducto or "Producto",
-
-        [
-
-            ("Fecha", it.fecha),
-
-            ("Estado", it.estadoproducto),
-
-            ("Valor", f"${it.valordelbien}" if it.valordelbien is not None else ""),
-
-        ],
-
-        it.descripcion
-
-    ))
-
-
-    # ========== Certificados full page ==========
-
-    if cert_imgs:
-
-        for ev in cert_imgs:
-
-            new_page(with_sidebar=False)
-
-            c.setFillColor(navy2)
-
-            c.rect(0, H - 2.0 * cm, W, 2.0 * cm, stroke=0, fill=1)
-
-            c.setFillColor(white)
-
-            c.setFont(FONT_B, 13.5)
-
-            c.drawString(margin, H - 1.3 * cm, f'{ev["section"]} | {ev["label"]}'[:100])
-
-
-            try:
-
-                img_reader = _image_reader_from_field(ev["field"])
-
-                c.drawImage(img_reader, margin, margin, W - 2*margin, H - 3*cm, preserveAspectRatio=True, mask="auto")
-
-            except Exception:
-
-                pass
-
-
-    # ========== Imágenes normales ==========
-
-    if normal_imgs:
-
-        new_page(with_sidebar=False)
-
-        c.setFillColor(navy2)
-
-        c.rect(0, H - 2.0 * cm, W, 2.0 * cm, stroke=0, fill=1)
-
-        c.setFillColor(white)
-
-        c.setFont(FONT_B, 16)
-
-        c.drawString(margin, H - 1.3 * cm, "Imágenes")
+from django.shortcuts import render
 
+from django.urls import reverse
 
-    c.showPage()
+from django.utils.cache import patch_cache_control
 
-    c.save()
+from django.utils.functional import SimpleLazyObject
 
-    return response
+from django.views.decorators.http import condition, etag, require_GET, require_POST
 
-import io
 
-import os
+from .cache import (
 
+    PERFIL_ACTIVO_KEY,
 
-from django.http import HttpResponse, HttpResponseForbidden
+    VERSION_PAGINAS,
 
-from django.shortcuts import render
+    conteos_key,
 
+    estado_seccion_key,
 
-from reportlab.lib.pagesizes import A4
+    estado_variantes,
 
-from reportlab.lib.units import cm
+    get_version,
 
-from reportlab.lib import colors
+    get_versiones_filas,
 
-from reportlab.pdfgen import canvas
+    normalizar_calidad,
 
-from reportlab.lib.utils import ImageReader, simpleSplit
+    normalizar_secciones,
 
+    pagina_key,
 
-from reportlab.pdfbase import pdfmetrics
+    pdf_etag,
 
-from reportlab.pdfbase.ttfonts import TTFont
+    registrar_pedido,
 
+)
 
 from .models import (
 
@@ -1147,6 +82,12 @@ from .models import (
 
 )
 
+from .pdf import archivo_pdf, obtener_pdf
+
+from .signals import MODELOS_HIJOS
+
+from .trabajos import ERROR, LISTO, encolar_pdf, get_trabajo, pdf_de_trabajo
+
 
 
 # =========================
@@ -1155,1055 +96,908 @@ from .models import (
 
 # =========================
 
-def _get_perfil_activo():
+def _get_perfil_activo(request=None):
 
     # SOLO perfil activo. Si no hay, devuelve None (y el front no debe mostrar nada).
 
-    return Datospersonales.objects.filter(perfilactivo=True).order_by("-idperfil").first()
-
-
-
-def _image_reader_from_field(image_field):
-
-    image_field.open("rb")
-
-    try:
-
-        data = image_field.read()
+    # Se guarda en la caché compartida (la invalida Datospersonales.save / el delete) y en el
 
-    finally:
+    # request, porque el ETag y la vista lo piden dos veces en la misma petición.
 
-        try:
+    if request is not None and hasattr(request, "_cv_perfil_activo"):
 
-            image_field.close()
+        return request._cv_perfil_activo
 
-        except Exception:
 
-            pass
+    cacheado = cache.get(PERFIL_ACTIVO_KEY)
 
-    return ImageReader(io.BytesIO(data))
+    if cacheado is None:
 
+        # En un dict para distinguir "no hay perfil activo" (None) de "no está en caché"
 
+        cacheado = {"perfil": Datospersonales.objects.filter(perfilactivo=True).order_by("-idperfil").first()}
 
-def _register_pretty_fonts():
+        cache.set(PERFIL_ACTIVO_KEY, cacheado, settings.CV_PDF_CACHE_TIMEOUT)
 
-    font_regular = "Helvetica"
 
-    font_bold = "Helvetica-Bold"
+    perfil = cacheado["perfil"]
 
+    if request is not None:
 
-    candidates = [
+        request._cv_perfil_activo = perfil
 
-        (r"C:\Windows\Fonts\segoeui.ttf", r"C:\Windows\Fonts\segoeuib.ttf", "SegoeUI", "SegoeUI-Bold"),
+    return perfil
 
-        (r"C:\Windows\Fonts\calibri.ttf", r"C:\Windows\Fonts\calibrib.ttf", "Calibri", "Calibri-Bold"),
 
-    ]
 
-    for reg_path, bold_path, reg_name, bold_name in candidates:
+def _cache_pagina(modelo=None):
 
-        try:
-
-            if os.path.exists(reg_path) and os.path.exists(bold_path):
-
-                pdfmetrics.registerFont(TTFont(reg_name, reg_path))
-
-                pdfmetrics.registerFont(TTFont(bold_name, bold_path))
-
-                font_regular = reg_name
+    """
 
-                font_bold = bold_name
+    Respuesta completa cacheada para las visitas anónimas (opt-in: CV_PAGINA_CACHE).
 
-                break
+    La clave lleva el perfil activo y su versión, así que cualquier cambio desde el admin
 
-        except Exception:
+    (signals) la deja huérfana; con la caché caliente la vista no toca la base.
 
-            continue
+    El staff siempre ve la página recién renderizada.
 
+    De la URL solo entran el path y, en las secciones (`modelo`), un ?despues= firmado por
 
-    return font_regular, font_bold
+    _pagina_keyset: con cualquier otro parámetro no se usa la caché, así un crawler con
 
+    querystrings inventados no la llena (el culling se llevaría también las versiones).
 
+    """
 
-def _clean(value):
+    def decorador(vista):
 
-    if value is None:
+        @wraps(vista)
 
-        return ""
+        def envoltura(request, *args, **kwargs):
 
-    if isinstance(value, str):
+            if not settings.CV_PAGINA_CACHE or request.method not in ("GET", "HEAD") or request.user.is_staff:
 
-        return value.strip()
+                return vista(request, *args, **kwargs)
 
-    return str(value)
 
+            despues = request.GET.getlist("despues")
 
+            if set(request.GET) - {"despues"} or len(despues) > 1:
 
-def _draw_wrapped(c, text, x, y, max_width, font_name, font_size, leading):
+                return vista(request, *args, **kwargs)
 
-    if not text or not str(text).strip():
+            if despues and (modelo is None or not _cursor_firmado(modelo, despues[0])):
 
-        return y
+                return vista(request, *args, **kwargs)
 
-    lines = simpleSplit(str(text), font_name, font_size, max_width)
 
-    for ln in lines:
+            perfil = _get_perfil_activo(request)
 
-        c.drawString(x, y, ln)
+            perfil_id = perfil.pk if perfil else 0
 
-        y -= leading
+            ruta = f"{request.path}?despues={despues[0]}" if despues else request.path
 
-    return y
+            key = pagina_key(perfil_id, get_version(perfil_id), ruta)
 
 
+            cacheada = cache.get(key)
 
-def _pairs_from_fields(pairs):
+            if cacheada is not None:
 
-    out = []
+                contenido, content_type = cacheada
 
-    for label, val in pairs:
+                # El HTML guardado trae el csrf de otro visitante: el JS de home usa la cookie, que se setea acá
 
-        val = _clean(val)
+                get_token(request)
 
-        if val:
+                return HttpResponse(contenido, content_type=content_type)
 
-            out.append((label, val))
 
-    return out
+            response = vista(request, *args, **kwargs)
 
+            if response.status_code == 200 and not response.streaming:
 
+                # Solo el cuerpo: las cookies de esta respuesta son de este visitante
 
-def _collect_images(perfil, cursos, experiencias, prod_acad, prod_lab, reconoc):
+                cache.set(key, (response.content, response["Content-Type"]), settings.CV_PAGINA_CACHE_TIMEOUT)
 
-    """
+            return response
 
-    certificados: imágenes tipo certificado (una por hoja)
 
-    normales: imágenes tipo "foto del producto" (en grid)
+        return envoltura
 
-    """
 
-    certificados = []
+    return decorador
 
-    normales = []
 
 
-    def add_cert(section, label, field):
+# Clave en el template de home -> modelo hijo
 
-        if field and getattr(field, "name", None):
+MODELOS_CONTEO = {
 
-            certificados.append({"section": section, "label": label, "field": field})
+    "cursos": Cursosrealizados,
 
+    "experiencias": Experiencialaboral,
 
-    def add_normal(section, label, field, kind="Imagen"):
+    "prod_acad": Productosacademicos,
 
-        if field and getattr(field, "name", None):
+    "prod_lab": Productoslaborales,
 
-            normales.append({"section": section, "label": f"{label} — {kind}", "field": field})
+    "reconoc": Reconocimientos,
 
+    "venta": Ventagarage,
 
-    for c_ in cursos:
+}
 
-        base = f'Curso "{c_.nombrecurso or "Sin título"}"'
 
-        add_cert("Cursos", base, c_.certificado_imagen)
 
+def _contar_secciones(perfil):
 
-    for e in experiencias:
+    """
 
-        cargo = e.cargodesempenado or "Sin título"
+    Cantidad de registros visibles por sección en UNA consulta (un subquery correlacionado por
 
-        emp = f" - {e.nombrempresa}" if e.nombrempresa else ""
+    sección; con JOINs los COUNT se multiplicarían entre sí). Se cachea por versión del perfil:
 
-        base = f'Experiencia "{cargo}{emp}"'
+    cualquier alta/edición/baja de un hijo la cambia (signals).
 
-        add_cert("Experiencia laboral", base, e.certificado_imagen)
+    """
 
+    key = conteos_key(perfil.pk, get_version(perfil.pk))
 
-    for p in prod_acad:
+    counts = cache.get(key)
 
-        base = f'Producto académico "{p.nombreproducto or "Sin título"}"'
+    if counts is None:
 
-        add_normal("Productos académicos", base, p.imagenproducto, "Imagen del producto")
+        # Alias con prefijo: "cursos" y otros chocan con los related_name del modelo
 
-        add_cert("Productos académicos", base, p.certificado_imagen)
+        subqueries = {
 
+            f"n_{nombre}": Coalesce(Subquery(
 
-    for p in prod_lab:
+                modelo.objects
 
-        base = f'Producto laboral "{p.nombreproducto or "Sin título"}"'
+                .filter(perfil=OuterRef("pk"), activarparaqueseveaenfront=True)
 
-        add_normal("Productos laborales", base, p.imagenproducto, "Imagen del producto")
+                .order_by()
 
-        add_cert("Productos laborales", base, p.certificado_imagen)
+                .values("perfil")
 
+                .annotate(n=Count("pk"))
 
-    # ✅ FIX: en tu modelo el campo es entidadpatrocinadora
+                .values("n")
 
-    for r in reconoc:
+            ), 0)
 
-        tipo = r.tiporeconocimiento or "Reconocimiento"
+            for nombre, modelo in MODELOS_CONTEO.items()
 
-        ent = f" - {r.entidadpatrocinadora}" if r.entidadpatrocinadora else ""
+        }
 
-        base = f'Reconocimiento "{tipo}{ent}"'
+        fila = Datospersonales.objects.filter(pk=perfil.pk).values(**subqueries).get()
 
-        add_cert("Reconocimientos", base, r.certificado_imagen)
+        counts = {nombre: fila[f"n_{nombre}"] for nombre in MODELOS_CONTEO}
 
+        cache.set(key, counts, settings.CV_PDF_CACHE_TIMEOUT)
 
-    return certificados, normales
+    return counts
 
 
 
 # =========================
 
-# Views web
+# Conditional GET (Last-Modified / ETag)
 
 # =========================
 
-def home(request):
-
-    perfil = _get_perfil_activo()
-
-    permitir_impresion = bool(perfil and perfil.permitir_impresion)
-
-
-    counts = {
-
-        "cursos": perfil.cursos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "experiencias": perfil.experiencias.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "prod_acad": perfil.productos_academicos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "prod_lab": perfil.productos_laborales.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "reconoc": perfil.reconocimientos.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-        "venta": perfil.venta_garage.filter(activarparaqueseveaenfront=True).count() if perfil else 0,
-
-    }
-
-
-    return render(request, "home.html", {
-
-        "perfil": perfil,
-
-        "permitir_impresion": permitir_impresion,
-
-        "counts": counts,
-
-    })
-
-
-
-def datos_personales(request):
-
-    perfil = _get_perfil_activo()
-
-    return render(request, "secciones/datos_personales.html", {"perfil": perfil})
-
-
-
-def cursos(request):
-
-    perfil = _get_perfil_activo()
-
-    items = (
-
-        perfil.cursos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechafin", "-fechainicio", "-idcursorealizado")
-
-        if perfil else []
-
-    )
-
-    return render(request, "secciones/cursos.html", {"perfil": perfil, "items": items})
+def _estado_seccion(request, relacion):
 
+    """
 
+    (etag, última modificación) de una página de sección. MAX(updated_at) y COUNT de todos
 
-def experiencia(request):
+    los registros de la sección (ocultar uno también cambia la página) en un solo aggregate,
 
-    perfil = _get_perfil_activo()
+    cacheado por la versión de la sección. Una baja no deja un updated_at más nuevo: el COUNT
 
-    items = (
+    cambia el ETag y el signal marca el perfil, que también cuenta para el Last-Modified.
 
-        perfil.experiencias
+    """
 
-        .filter(activarparaqueseveaenfront=True)
+    if hasattr(request, "_cv_estado"):
 
-        .order_by("-fechafin", "-fechainicio", "-idexperiencialaboral")
+        return request._cv_estado
 
-        if perfil else []
 
-    )
+    perfil = _get_perfil_activo(request)
 
-    return render(request, "secciones/experiencia.html", {"perfil": perfil, "items": items})
+    estado = (None, None)
 
+    if perfil:
 
+        registros = getattr(perfil, relacion).all()
 
-def productos_academicos(request):
+        seccion = MODELOS_HIJOS[registros.model]
 
-    perfil = _get_perfil_activo()
+        key = estado_seccion_key(perfil.pk, seccion, get_version(perfil.pk, seccion))
 
-    # no tiene fecha, lo dejamos por id
+        agregado = cache.get(key)
 
-    items = (
+        if agregado is None:
 
-        perfil.productos_academicos
+            agregado = registros.aggregate(ultimo=Max("updated_at"), total=Count("pk"))
 
-        .filter(activarparaqueseveaenfront=True)
+            cache.set(key, agregado, settings.CV_PDF_CACHE_TIMEOUT)
 
-        .order_by("-idproductoacademico")
 
-        if perfil else []
+        ultimo = max(filter(None, (agregado["ultimo"], perfil.updated_at)))
 
-    )
+        base = f"{VERSION_PAGINAS}:{perfil.pk}:{ultimo.isoformat()}:{agregado['total']}"
 
-    return render(request, "secciones/productos_academicos.html", {"perfil": perfil, "items": items})
+        estado = (hashlib.sha1(base.encode()).hexdigest(), ultimo)
 
 
+    request._cv_estado = estado
 
-def productos_laborales(request):
+    return estado
 
-    perfil = _get_perfil_activo()
 
-    items = (
 
-        perfil.productos_laborales
+def _estado_perfil(request):
 
-        .filter(activarparaqueseveaenfront=True)
+    perfil = _get_perfil_activo(request)
 
-        .order_by("-fechaproducto", "-idproductolaboral")
+    if not perfil:
 
-        if perfil else []
+        return None, None
 
-    )
+    base = f"{VERSION_PAGINAS}:{perfil.pk}:{perfil.updated_at.isoformat()}"
 
-    return render(request, "secciones/productos_laborales.html", {"perfil": perfil, "items": items})
+    return hashlib.sha1(base.encode()).hexdigest(), perfil.updated_at
 
 
 
-def reconocimientos(request):
+def _condicional(estado):
 
-    perfil = _get_perfil_activo()
+    """
 
-    items = (
+    Responde 304 si el navegador ya tiene la versión actual (If-None-Match / If-Modified-Since).
 
-        perfil.reconocimientos
+    `estado(request)` devuelve (etag, última modificación).
 
-        .filter(activarparaqueseveaenfront=True)
+    """
 
-        .order_by("-fechareconocimiento", "-idreconocimiento")
+    def decorador(vista):
 
-        if perfil else []
+        @condition(
 
-    )
+            etag_func=lambda request, *args, **kwargs: estado(request)[0],
 
-    return render(request, "secciones/reconocimientos.html", {"perfil": perfil, "items": items})
+            last_modified_func=lambda request, *args, **kwargs: estado(request)[1],
 
+        )
 
+        @wraps(vista)
 
-def venta_garage(request):
+        def envoltura(request, *args, **kwargs):
 
-    perfil = _get_perfil_activo()
+            response = vista(request, *args, **kwargs)
 
-    items = (
+            # Que el navegador revalide siempre (con 304 es barato) en vez de adivinar la frescura
 
-        perfil.venta_garage
+            patch_cache_control(response, no_cache=True)
 
-        .filter(activarparaqueseveaenfront=True)
+            return response
 
-        .order_by("-fecha", "-idventagarage")
 
-        if perfil else []
+        return envoltura
 
-    )
 
-    return render(request, "secciones/venta_garage.html", {"perfil": perfil, "items": items})
+    return decorador
 
 
 
 # =========================
 
-# PDF (ReportLab)
+# Paginación por cursor (listas de secciones)
 
 # =========================
 
-def imprimir_hoja_vida(request):
-
-    perfil = _get_perfil_activo()
-
-
-    if not perfil:
-
-        return HttpResponse("Perfil no encontrado", status=404)
-
-
-    if not perfil.permitir_impresion:
-
-        return HttpResponseForbidden("No autorizado", status=403)
-
-
-    # ============================
-
-    # Consultas base
-
-    # ============================
-
-    cursos_qs = list(
-
-        perfil.cursos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechafin", "-fechainicio", "-idcursorealizado")
-
-    )
-
-    exp_qs = list(
-
-        perfil.experiencias
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechafin", "-fechainicio", "-idexperiencialaboral")
-
-    )
-
-    rec_qs = list(
-
-        perfil.reconocimientos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-fechareconocimiento", "-idreconocimiento")
-
-    )
-
-    pa_qs = list(
-
-        perfil.productos_academicos
-
-        .filter(activarparaqueseveaenfront=True)
-
-        .order_by("-idproductoacademico")
+# Los cursores van firmados (uno por modelo): solo se aceptan los que emitió _pagina_keyset,
 
-    )
+# así un cursor inventado no abre otra entrada en la caché de fragmentos de la sección
 
-    pl_qs = list(
+def _firmador_cursor(model):
 
-        perfil.productos_laborales
+    return signing.Signer(salt=f"cv.cursor.{model._meta.label_lower}")
 
-        .filter(activarparaqueseveaenfront=True)
 
-        .order_by("-fechaproducto", "-idproductolaboral")
 
-    )
+def _cursor(model, valores):
 
-    vg_qs = list(
+    crudo = base64.urlsafe_b64encode(json.dumps([str(v) for v in valores]).encode()).decode().rstrip("=")
 
-        perfil.venta_garage
+    return _firmador_cursor(model).sign(crudo)
 
-        .filter(activarparaqueseveaenfront=True)
 
-        .order_by("-fecha", "-idventagarage")
 
-    )
+def _cursor_firmado(model, token):
 
+    try:
 
-    # ============================
-
-    # FILTRO DESDE MODAL (checks)
-
-    # ============================
-
-    filtros = {"exp", "cursos", "recon", "pa", "pl", "vg"}
-
-    hay_filtro = any(k in request.GET for k in filtros)
+        _firmador_cursor(model).unsign(token)
 
+    except signing.BadSignature:
 
-    if hay_filtro:
+        return False
 
-        if "exp" not in request.GET:
+    return True
 
-            exp_qs = []
 
-        if "cursos" not in request.GET:
 
-            cursos_qs = []
+def _leer_cursor(token, model, campos):
 
-        if "recon" not in request.GET:
+    # Cursor inválido, manipulado o no firmado: se ignora y se muestra la primera página
 
-            rec_qs = []
+    if not token:
 
-        if "pa" not in request.GET:
+        return None
 
-            pa_qs = []
+    try:
 
-        if "pl" not in request.GET:
+        crudo = _firmador_cursor(model).unsign(token)
 
-            pl_qs = []
+        crudos = json.loads(base64.urlsafe_b64decode(crudo + "=" * (-len(crudo) % 4)))
 
-        if "vg" not in request.GET:
+        if len(crudos) != len(campos):
 
-            vg_qs = []
+            return None
 
+        return [model._meta.get_field(c).to_python(v) for c, v in zip(campos, crudos)]
 
-    # ============================
+    except Exception:
 
-    # Imágenes (según lo filtrado)
+        return None
 
-    # ============================
 
-    cert_imgs, normal_imgs = _collect_images(perfil, cursos_qs, exp_qs, pa_qs, pl_qs, rec_qs)
 
+def _pagina_keyset(request, qs, orden):
 
-    FONT, FONT_B = _register_pretty_fonts()
+    """
 
+    Una página de `qs` en el orden `orden` (el último campo es la PK, desempata) a partir del
 
-    response = HttpResponse(content_type="application/pdf")
+    cursor ?despues=. Devuelve (items, cursor de la siguiente página o None).
 
-    response["Content-Disposition"] = 'inline; filename="hoja_de_vida.pdf"'
+    En vez de OFFSET se filtra "después del último visto", así que cualquier página cuesta lo
 
+    mismo: el índice de la sección (0002_indices_secciones) va directo a esa posición.
 
-    c = canvas.Canvas(response, pagesize=A4)
+    """
 
-    W, H = A4
+    campos = [c.lstrip("-") for c in orden]
 
+    ops = ["lt" if c.startswith("-") else "gt" for c in orden]
 
-    # Colores
+    qs = qs.order_by(*orden)
 
-    navy = colors.HexColor("#0b2a57")
 
-    navy2 = colors.HexColor("#0a2347")
+    valores = _leer_cursor(request.GET.get("despues"), qs.model, campos)
 
-    white = colors.white
+    if valores is not None:
 
-    text = colors.HexColor("#0f172a")
+        # (a, b, pk) < (va, vb, vpk) => a < va OR (a = va AND b < vb) OR (a = va AND b = vb AND pk < vpk)
 
-    muted = colors.HexColor("#475569")
+        despues = Q()
 
-    border = colors.HexColor("#dbe4f5")
+        for i, (campo, op) in enumerate(zip(campos, ops)):
 
-    chip = colors.HexColor("#e9f0ff")
+            iguales = dict(zip(campos[:i], valores[:i]))
 
+            despues |= Q(**iguales, **{f"{campo}__{op}": valores[i]})
 
-    # Layout
+        # La condición redundante sobre el primer campo es la que deja usar el índice como rango
 
-    margin = 1.2 * cm
+        primero = {f"{campos[0]}__{ops[0]}e": valores[0]}  # lte / gte
 
-    sidebar_w = 5.7 * cm
+        qs = qs.filter(Q(**primero) & despues)
 
-    gap = 0.8 * cm
 
+    por_pagina = settings.CV_SECCION_POR_PAGINA
 
-    sidebar_w_total = margin + sidebar_w + gap / 2
+    items = list(qs[:por_pagina + 1])
 
-    content_x = margin + sidebar_w + gap
+    if len(items) <= por_pagina:
 
-    content_w = W - content_x - margin
+        return items, None
 
+    items = items[:por_pagina]
 
-    lead_small = 12.5
+    return items, _cursor(qs.model, (getattr(items[-1], c) for c in campos))
 
 
-    def draw_sidebar_background():
 
-        c.setFillColor(navy)
+def _lista_seccion(request, perfil, relacion, orden):
 
-        c.rect(0, 0, sidebar_w_total, H, stroke=0, fill=1)
+    """
 
+    Contexto común de las páginas de sección: una página de registros visibles + "Cargar más".
 
-    def draw_circle_image(image_reader, cx, cy, r):
+    El template cachea la sección entera (versión de la sección + cursor) y cada tarjeta
 
-        c.saveState()
+    (pk + versión del registro); items y siguiente son perezosos, así que si la sección
 
-        p = c.beginPath()
+    está en caché no se consulta la base.
 
-        p.circle(cx, cy, r)
+    """
 
-        c.clipPath(p, stroke=0, fill=0)
+    model = getattr(Datospersonales, relacion).rel.related_model
 
-        c.drawImage(image_reader, cx - r, cy - r, width=2 * r, height=2 * r, preserveAspectRatio=True, mask="auto")
 
-        c.restoreState()
+    # Cursor inválido o no firmado = primera página: no abre otra entrada en la caché
 
+    despues = request.GET.get("despues")
 
-    def hr_sidebar(y):
+    if _leer_cursor(despues, model, [c.lstrip("-") for c in orden]) is None:
 
-        c.setStrokeColor(colors.HexColor("#2a4a7d"))
+        despues = ""
 
-        c.setLineWidth(1)
 
-        c.line(margin, y, margin + sidebar_w - 0.2 * cm, y)
+    # Lo que usa el template aunque no haya perfil activo (el {% cache %} necesita el timeout)
 
+    contexto = {
 
-    def draw_sidebar_content():
+        "perfil": perfil,
 
-        top_y = H - margin - 0.4 * cm
+        "items": [],
 
+        "siguiente": None,
 
-        if perfil.foto_perfil and getattr(perfil.foto_perfil, "name", None):
+        "scroll_infinito": settings.CV_SECCION_SCROLL_INFINITO,
 
-            try:
+        "version_seccion": 0,
 
-                img_reader = _image_reader_from_field(perfil.foto_perfil)
+        "version_paginas": VERSION_PAGINAS,
 
-                draw_circle_image(img_reader, margin + 2.0 * cm, top_y - 1.85 * cm, 1.55 * cm)
+        "despues": despues,
 
-            except Exception:
+        "fragmento_timeout": settings.CV_SECCION_CACHE_TIMEOUT,
 
-                pass
+    }
 
+    if not perfil:
 
-        nombre = f"{(perfil.nombres or '').strip()} {(perfil.apellidos or '').strip()}".strip() or "Perfil"
+        return contexto
 
-        c.setFillColor(white)
 
-        c.setFont(FONT_B, 14.2)
+    qs = getattr(perfil, relacion).filter(activarparaqueseveaenfront=True)
 
-        c.drawString(margin, top_y - 4.05 * cm, nombre[:28])
+    seccion = MODELOS_HIJOS[model]
 
+    pagina = []
 
-        desc_local = _clean(perfil.descripcionperfil)
 
-        if desc_local:
+    def _pagina():
 
-            c.setFillColor(colors.HexColor("#d7e6ff"))
+        # Las versiones de los registros recién se pueden leer con los pk ya consultados: si
 
-            c.setFont(FONT, 9.6)
+        # un cambio entra en el medio, una tarjeta vieja quedaría con la versión nueva. Todo
 
-            _draw_wrapped(c, desc_local, margin, top_y - 4.65 * cm, sidebar_w - 0.2 * cm, FONT, 9.6, 12)
+        # cambio de un registro cambia también la versión de la sección, así que si esa no se
 
+        # movió entre antes de la consulta y después de leer las versiones, el par es consistente.
 
-        yL = top_y - 5.9 * cm
+        if not pagina:
 
-        hr_sidebar(yL + 0.45 * cm)
+            for _ in range(3):
 
-        c.setFillColor(colors.HexColor("#d7e6ff"))
+                antes = get_version(perfil.pk, seccion)
 
-        c.setFont(FONT_B, 10)
+                items, siguiente = _pagina_keyset(request, qs, orden)
 
-        c.drawString(margin, yL, "DATOS PERSONALES")
+                versiones = get_versiones_filas(qs.model, [x.pk for x in items])
 
-        yL -= 0.65 * cm
+                if get_version(perfil.pk, seccion) == antes:
 
+                    break
 
-        dp_pairs = _pairs_from_fields([
+            else:
 
-            ("Cédula", perfil.numerocedula),
+                # Cambios sin parar: estas tarjetas se renderizan sin reutilizar ninguna entrada
 
-            ("Sexo", perfil.sexo),
+                versiones = {pk: f"{v}-{time.time_ns()}" for pk, v in versiones.items()}
 
-            ("Estado civil", perfil.estadocivil),
+            for x in items:
 
-            ("Fecha nac.", perfil.fechanacimiento),
+                x.version_fila = versiones[x.pk]
 
-            ("Nacionalidad", perfil.nacionalidad),
+            pagina.extend((items, siguiente))
 
-            ("Lugar nac.", perfil.lugarnacimiento),
+        return pagina
 
-            ("Licencia", perfil.licenciaconducir),
 
-            ("Teléfono", perfil.telefonofijo),
+    contexto.update({
 
-            ("Convencional", perfil.telefonoconvencional),
+        "items": SimpleLazyObject(lambda: _pagina()[0]),
 
-            ("Dirección dom.", perfil.direcciondomiciliaria),
+        "siguiente": SimpleLazyObject(lambda: _pagina()[1]),
 
-            ("Dirección trab.", perfil.direcciontrabajo),
+        "version_seccion": get_version(perfil.pk, seccion),
 
-            ("Sitio web", perfil.sitioweb),
+    })
 
-        ])
+    return contexto
 
 
-        for label, val in dp_pairs:
 
-            c.setFillColor(colors.HexColor("#d7e6ff"))
+# =========================
 
-            c.setFont(FONT_B, 9.1)
+# Views web
 
-            c.drawString(margin, yL, f"{label}:")
+# =========================
 
-            yL -= 0.35 * cm
+@_cache_pagina()
 
-            c.setFillColor(white)
+def home(request):
 
-            c.setFont(FONT, 9.5)
+    perfil = _get_perfil_activo(request)
 
-            yL = _draw_wrapped(c, val, margin, yL, sidebar_w - 0.2 * cm, FONT, 9.5, 11.5)
+    permitir_impresion = bool(perfil and perfil.permitir_impresion)
 
-            yL -= 0.2 * cm
 
-            if yL < 1.6 * cm:
+    counts = _contar_secciones(perfil) if perfil else dict.fromkeys(MODELOS_CONTEO, 0)
 
-                break
 
+    return render(request, "home.html", {
 
-    def new_page(with_sidebar=True):
+        "perfil": perfil,
 
-        c.showPage()
+        "permitir_impresion": permitir_impresion,
 
-        if with_sidebar:
+        "counts": counts,
 
-            draw_sidebar_background()
+    })
 
-            draw_sidebar_content()
 
 
-    def content_title(y, s):
+@_condicional(_estado_perfil)
 
-        c.setFillColor(text)
+@_cache_pagina()
 
-        c.setFont(FONT_B, 13.8)
+def datos_personales(request):
 
-        c.drawString(content_x, y, s)
+    perfil = _get_perfil_activo(request)
 
-        c.setStrokeColor(border)
+    return render(request, "secciones/datos_personales.html", {"perfil": perfil})
 
-        c.setLineWidth(1)
 
-        c.line(content_x, y - 0.25 * cm, content_x + content_w, y - 0.25 * cm)
 
-        return y - 0.85 * cm
+@_condicional(lambda request: _estado_seccion(request, "cursos"))
 
+@_cache_pagina(Cursosrealizados)
 
-    def content_card(y, title_s, pairs, notes=None):
+def cursos(request):
 
-        pairs = _pairs_from_fields(pairs)
+    perfil = _get_perfil_activo(request)
 
-        notes = _clean(notes)
+    contexto = _lista_seccion(request, perfil, "cursos", ("-fechafin", "-fechainicio", "-idcursorealizado"))
 
+    return render(request, "secciones/cursos.html", contexto)
 
-        if not pairs and not notes:
 
-            return y
 
+@_condicional(lambda request: _estado_seccion(request, "experiencias"))
 
-        if y < 4.0 * cm:
+@_cache_pagina(Experiencialaboral)
 
-            new_page(with_sidebar=True)
+def experiencia(request):
 
-            y = H - margin - 0.6 * cm
+    perfil = _get_perfil_activo(request)
 
+    contexto = _lista_seccion(request, perfil, "experiencias", ("-fechafin", "-fechainicio", "-idexperiencialaboral"))
 
-        inner_x = content_x
+    return render(request, "secciones/experiencia.html", contexto)
 
-        inner_w = content_w
 
 
-        c.setFillColor(navy2)
+@_condicional(lambda request: _estado_seccion(request, "productos_academicos"))
 
-        c.setFont(FONT_B, 11.6)
+@_cache_pagina(Productosacademicos)
 
-        c.drawString(inner_x, y - 0.2 * cm, (title_s or "")[:92])
+def productos_academicos(request):
 
+    perfil = _get_perfil_activo(request)
 
-        yy = y - 0.75 * cm
+    # no tiene fecha, lo dejamos por id
 
+    contexto = _lista_seccion(request, perfil, "productos_academicos", ("-idproductoacademico",))
 
-        for label, val in pairs:
+    return render(request, "secciones/productos_academicos.html", contexto)
 
-            c.setFillColor(text)
 
-            c.setFont(FONT_B, 9.8)
 
-            c.drawString(inner_x, yy, f"{label}:")
+@_condicional(lambda request: _estado_seccion(request, "productos_laborales"))
 
-            c.setFillColor(muted)
+@_cache_pagina(Productoslaborales)
 
-            c.setFont(FONT, 9.8)
+def productos_laborales(request):
 
-            yy = _draw_wrapped(c, val, inner_x + 3.25 * cm, yy, inner_w - 3.25 * cm, FONT, 9.8, lead_small)
+    perfil = _get_perfil_activo(request)
 
-            yy -= 2
+    contexto = _lista_seccion(request, perfil, "productos_laborales", ("-fechaproducto", "-idproductolaboral"))
 
+    return render(request, "secciones/productos_laborales.html", contexto)
 
-            if yy < 2.2 * cm:
 
-                new_page(with_sidebar=True)
 
-                y = H - margin - 0.6 * cm
+@_condicional(lambda request: _estado_seccion(request, "reconocimientos"))
 
-                yy = y - 0.9 * cm
+@_cache_pagina(Reconocimientos)
 
+def reconocimientos(request):
 
-        if notes:
+    perfil = _get_perfil_activo(request)
 
-            yy -= 6
+    contexto = _lista_seccion(request, perfil, "reconocimientos", ("-fechareconocimiento", "-idreconocimiento"))
 
-            c.setFillColor(text)
+    return render(request, "secciones/reconocimientos.html", contexto)
 
-            c.setFont(FONT_B, 9.8)
 
-            c.drawString(inner_x, yy, "Descripción:")
 
-            yy -= lead_small
+@_condicional(lambda request: _estado_seccion(request, "venta_garage"))
 
-            c.setFillColor(muted)
+@_cache_pagina(Ventagarage)
 
-            c.setFont(FONT, 9.8)
+def venta_garage(request):
 
-            yy = _draw_wrapped(c, notes, inner_x, yy, inner_w, FONT, 9.8, lead_small)
+    perfil = _get_perfil_activo(request)
 
+    contexto = _lista_seccion(request, perfil, "venta_garage", ("-fecha", "-idventagarage"))
 
-        yy -= 0.25 * cm
+    return render(request, "secciones/venta_garage.html", contexto)
 
-        c.setStrokeColor(border)
 
-        c.setLineWidth(0.7)
 
-        c.line(content_x, yy, content_x + content_w, yy)
+# =========================
 
+# PDF (ReportLab)
 
-        return yy - 0.45 * cm
+# =========================
 
+def _imprimir_etag(request):
 
-    # ========== Página CV ==========
+    # Sin perfil o sin permiso no hay ETag: la vista responde 404/403 como siempre
 
-    draw_sidebar_background()
+    perfil = _get_perfil_activo(request)
 
-    draw_sidebar_content()
+    if not perfil or not perfil.permitir_impresion:
 
+        return None
 
-    desc = _clean(perfil.descripcionperfil)
+    return pdf_etag(perfil.pk, get_version(perfil.pk), normalizar_secciones(request.GET), normalizar_calidad(request.GET))
 
-    yR = H - margin - 0.6 * cm
 
 
-    if desc:
+@etag(_imprimir_etag)
 
-        yR = content_title(yR, "Perfil profesional")
+def imprimir_hoja_vida(request):
 
-        yR = content_card(yR, "Resumen", [], desc)
+    perfil = _get_perfil_activo(request)
 
-        yR -= 0.2 * cm
 
+    if not perfil:
 
-    def section(title_name, items, draw_item):
+        return HttpResponse("Perfil no encontrado", status=404)
 
-        nonlocal yR
 
-        if not items:
+    if not perfil.permitir_impresion:
 
-            return
+        return HttpResponseForbidden("No autorizado", status=403)
 
 
-        if yR < 4.0 * cm:
+    # ============================
 
-            new_page(with_sidebar=True)
+    # FILTRO DESDE MODAL (checks) + caché por versión de contenido
 
-            yR = H - margin - 0.6 * cm
+    # ============================
 
+    secciones = normalizar_secciones(request.GET)
 
-        yR = content_title(yR, title_name)
+    calidad = normalizar_calidad(request.GET)
 
+    registrar_pedido(perfil.pk, secciones)
 
-        for it in items:
 
-            if yR < 3.2 * cm:
+    # Streaming: por setting o puntual con ?stream=1
 
-                new_page(with_sidebar=True)
+    if settings.CV_PDF_STREAMING or request.GET.get("stream") == "1":
 
-                yR = H - margin - 0.6 * cm
+        # FileResponse manda el archivo en bloques y lo cierra al terminar la respuesta
 
-                yR = content_title(yR, title_name)
+        archivo, completo = archivo_pdf(perfil, secciones, calidad)
 
+        response = FileResponse(archivo, content_type="application/pdf")
 
-            yR = draw_item(it)
+    else:
 
-            yR -= 0.10 * cm
+        pdf, completo = obtener_pdf(perfil, secciones, calidad)
 
+        response = HttpResponse(pdf, content_type="application/pdf")
 
-        yR -= 0.25 * cm
+    response["Content-Disposition"] = 'inline; filename="hoja_de_vida.pdf"'
 
+    if completo:
 
-    section("Experiencia laboral", exp_qs, lambda it: content_card(
+        # Que navegador/proxy revaliden siempre con If-None-Match (304 sin renderizar)
 
-        yR,
+        patch_cache_control(response, no_cache=True)
 
-        ((it.cargodesempenado or "Experiencia") + (f" — {it.nombrempresa}" if it.nombrempresa else "")).strip(),
+    else:
 
-        [
+        # Un PDF incompleto no se guarda: con el mismo ETag el 304 lo dejaría fijo en el navegador
 
-            ("Inicio", it.fechainicio),
+        patch_cache_control(response, no_store=True)
 
-            ("Fin", it.fechafin),
+    return response
 
-            ("Lugar", it.lugarempresa),
 
-            ("Dirección", it.direccionempresa),
 
-            ("Sitio web", it.sitiowebempresa),
+@staff_member_required
 
-            ("Email", it.emailempresa),
+def estado_pdf(request):
 
-            ("Teléfono", it.telefonoempresa),
+    # Qué variantes del PDF ya están pre-renderizadas para la versión actual
 
-            ("Contacto", it.nombrecontactoempresarial),
+    perfil = _get_perfil_activo(request)
 
-            ("Tel. contacto", it.telefonocontactoempresarial),
+    if not perfil:
 
-            ("Funciones", it.descripcionfunciones),
+        return JsonResponse({"perfil": None, "variantes": []})
 
-        ],
 
-        it.responsabilidades
+    return JsonResponse({
 
-    ))
+        "perfil": perfil.pk,
 
+        "version": get_version(perfil.pk),
 
-    section("Cursos realizados", cursos_qs, lambda it: content_card(
+        "variantes": estado_variantes(perfil.pk),
 
-        yR,
+    })
 
-        it.nombrecurso or "Curso",
 
-        [
 
-            ("Inicio", it.fechainicio),
+# =========================
 
-            ("Fin", it.fechafin),
+# PDF en segundo plano (modal de home.html)
 
-            ("Total horas", it.totalhoras),
+# =========================
 
-            ("Entidad", it.entidadpatrocinadora),
+def _json_trabajo(trabajo):
 
-            ("Contacto", it.nombrecontactoauspicia),
+    data = {
 
-            ("Tel. contacto", it.telefonocontactoauspicia),
+        "id": trabajo["id"],
 
-            ("Email entidad", it.emailempresapatrocinadora),
+        "estado": trabajo["estado"],
 
-        ],
+        "secciones": trabajo["secciones"],
 
-        it.descripcioncurso
+        "calidad": trabajo["calidad"],
 
-    ))
+        "segundos": round((trabajo["terminado"] or time.time()) - trabajo["creado"], 1),
 
+    }
 
-    section("Productos académicos", pa_qs, lambda it: content_card(
+    if trabajo["estado"] == LISTO:
 
-        yR,
+        data["url"] = reverse("descargar_trabajo_pdf", args=[trabajo["id"]])
 
-        it.nombreproducto or "Producto académico",
+    if trabajo["estado"] == ERROR:
 
-        [("Clasificador", it.clasificador)],
+        data["error"] = trabajo["error"]
 
-        it.descripcion
+    return data
 
-    ))
 
 
-    section("Productos laborales", pl_qs, lambda it: content_card(
+@require_POST
 
-        yR,
+def encolar_trabajo_pdf(request):
 
-        it.nombreproducto or "Producto laboral",
+    perfil = _get_perfil_activo(request)
 
-        [("Fecha", it.fechaproducto)],
 
-        it.descripcion
+    if not perfil:
 
-    ))
+        return JsonResponse({"error": "Perfil no encontrado"}, status=404)
 
 
-    section("Reconocimientos", rec_qs, lambda it: content_card(
+    if not perfil.permitir_impresion:
 
-        yR,
+        return JsonResponse({"error": "No autorizado"}, status=403)
 
-        ((it.tiporeconocimiento or "Reconocimiento") + (f" — {it.entidadpatrocinadora}" if it.entidadpatrocinadora else "")).strip(),
 
-        [
+    secciones = normalizar_secciones(request.POST)
 
-            ("Fecha", it.fechareconocimiento),
+    registrar_pedido(perfil.pk, secciones)
 
-            ("Tipo", it.tiporeconocimiento),
 
-            ("Entidad", it.entidadpatrocinadora),
+    trabajo = encolar_pdf(perfil, secciones, normalizar_calidad(request.POST))
 
-        ],
+    if trabajo is None:
 
-        it.descripcionreconocimiento
+        response = JsonResponse({"error": "Hay muchos PDFs en cola. Intenta de nuevo en unos segundos."}, status=503)
 
-    ))
+        response["Retry-After"] = "10"
 
+        return response
 
-    section("Venta garage", vg_qs, lambda it: content_card(
+    response = JsonResponse(_json_trabajo(trabajo), status=202)
 
-        yR,
+    response["Location"] = reverse("estado_trabajo_pdf", args=[trabajo["id"]])
 
-        it.nombreproducto or "Producto",
+    return response
 
-        [
 
-            ("Fecha", it.fecha),
 
-            ("Estado", it.estadoproducto),
+@require_GET
 
-            ("Valor", f"${it.valordelbien}" if it.valordelbien is not None else ""),
+def estado_trabajo_pdf(request, trabajo_id):
 
-        ],
+    trabajo = get_trabajo(trabajo_id)
 
-        it.descripcion
+    if trabajo is None:
 
-    ))
+        return JsonResponse({"error": "Trabajo no encontrado o vencido"}, status=404)
 
 
-    # ========== Certificados full page ==========
+    response = JsonResponse(_json_trabajo(trabajo))
 
-    if cert_imgs:
+    patch_cache_control(response, no_store=True)
 
-        for ev in cert_imgs:
+    return response
 
-            new_page(with_sidebar=False)
 
-            c.setFillColor(navy2)
 
-            c.rect(0, H - 2.0 * cm, W, 2.0 * cm, stroke=0, fill=1)
+@require_GET
 
-            c.setFillColor(white)
+def descargar_trabajo_pdf(request, trabajo_id):
 
-            c.setFont(FONT_B, 13.5)
+    trabajo = get_trabajo(trabajo_id)
 
-            c.drawString(margin, H - 1.3 * cm, f'{ev["section"]} | {ev["label"]}'[:100])
+    if trabajo is None or trabajo["estado"] != LISTO:
 
+        return HttpResponse("PDF no disponible", status=404)
 
-            try:
 
-                img_reader = _image_reader_from_field(ev["field"])
+    # Se vuelve a mirar el perfil: si desactivaron la impresión mientras tanto, no se entrega
 
-                c.drawImage(img_reader, margin, margin, W - 2*margin, H - 3*cm, preserveAspectRatio=True, mask="auto")
+    perfil = _get_perfil_activo(request)
 
-            except Exception:
+    if not perfil or perfil.pk != trabajo["perfil"]:
 
-                pass
+        return HttpResponse("Perfil no encontrado", status=404)
 
 
-    # ========== Imágenes normales ==========
+    if not perfil.permitir_impresion:
 
-    if normal_imgs:
+        return HttpResponseForbidden("No autorizado", status=403)
 
-        new_page(with_sidebar=False)
 
-        c.setFillColor(navy2)
+    pdf, completo = pdf_de_trabajo(trabajo, perfil)
 
-        c.rect(0, H - 2.0 * cm, W, 2.0 * cm, stroke=0, fill=1)
+    response = HttpResponse(pdf, content_type="application/pdf")
 
-        c.setFillColor(white)
+    response["Content-Disposition"] = 'inline; filename="hoja_de_vida.pdf"'
 
-        c.setFont(FONT_B, 16)
+    patch_cache_control(response, private=True)
 
-        c.drawString(margin, H - 1.3 * cm, "Imágenes")
+    if not completo:
 
+        # Uno incompleto no se guarda ni en el navegador (igual que en /imprimir/)
 
-    c.showPage()
+        patch_cache_control(response, no_store=True)
 
-    c.save()
+    return response
 
-    return response
\ No newline at end of file
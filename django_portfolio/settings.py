@@ -290,6 +290,114 @@ AZURE_CUSTOM_DOMAIN = f"{AZURE_ACCOUNT_NAME}.blob.core.windows.net"
 MEDIA_URL = f"https://{AZURE_CUSTOM_DOMAIN}/{AZURE_CONTAINER}/"
 
 
+# =====================
+
+# CACHE
+
+# =====================
+
+# En disco para que todos los workers de gunicorn vean las mismas versiones/PDFs
+
+CACHES = {
+
+    "default": {
+
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+
+        "LOCATION": os.getenv("CACHE_DIR", str(BASE_DIR / ".cache")),
+
+        # Con el default (300) el culling borraría versiones y tarjetas cacheadas demasiado seguido
+
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 5000))},
+
+    }
+
+}
+
+
+# Los PDFs se invalidan por versión (signals); el timeout solo limpia restos viejos
+
+CV_PDF_CACHE_TIMEOUT = int(os.getenv("CV_PDF_CACHE_TIMEOUT", 60 * 60 * 24 * 7))
+
+
+# /imprimir/ desde un temporal con FileResponse (también se puede pedir puntual con ?stream=1)
+
+CV_PDF_STREAMING = os.getenv("CV_PDF_STREAMING", "0") == "1"
+
+CV_PDF_SPOOL_MAX_BYTES = int(os.getenv("CV_PDF_SPOOL_MAX_BYTES", 8 * 1024 * 1024))
+
+
+# Descarga en paralelo de imágenes desde Azure antes de dibujar: hilos por proceso
+
+# y plazo total (segundos) para todas las descargas de un render
+
+CV_PDF_PREFETCH_WORKERS = int(os.getenv("CV_PDF_PREFETCH_WORKERS", 8))
+
+CV_PDF_PREFETCH_TIMEOUT = float(os.getenv("CV_PDF_PREFETCH_TIMEOUT", 10))
+
+
+# Imágenes reducidas a la resolución en que se dibujan y recomprimidas (Pillow)
+
+CV_PDF_IMAGE_DPI = int(os.getenv("CV_PDF_IMAGE_DPI", 150))
+
+CV_PDF_JPEG_QUALITY = int(os.getenv("CV_PDF_JPEG_QUALITY", 80))
+
+
+# ?calidad=print (las de arriba son la calidad "web", la de siempre)
+
+CV_PDF_PRINT_DPI = int(os.getenv("CV_PDF_PRINT_DPI", 300))
+
+CV_PDF_PRINT_JPEG_QUALITY = int(os.getenv("CV_PDF_PRINT_JPEG_QUALITY", 90))
+
+
+# Memoria por render para imágenes (embebidas + decodificando); si no alcanza se baja el DPI
+
+CV_PDF_MEMORY_BUDGET_MB = int(os.getenv("CV_PDF_MEMORY_BUDGET_MB", 256))
+
+
+# Trabajos de PDF en segundo plano (hilos por worker, estado en la caché)
+
+CV_PDF_JOB_WORKERS = int(os.getenv("CV_PDF_JOB_WORKERS", 2))
+
+CV_PDF_JOB_TIMEOUT = int(os.getenv("CV_PDF_JOB_TIMEOUT", 60 * 60))
+
+# Trabajos esperando o dibujándose por proceso: más allá, el pedido recibe 503
+
+CV_PDF_JOB_MAX_COLA = int(os.getenv("CV_PDF_JOB_MAX_COLA", 20))
+
+# Pasado este tiempo desde que se encoló, un trabajo sin terminar se informa como error
+
+CV_PDF_JOB_MAX_SEGUNDOS = int(os.getenv("CV_PDF_JOB_MAX_SEGUNDOS", 5 * 60))
+
+
+# =====================
+
+# SECCIONES (listas del front)
+
+# =====================
+
+# Registros por página ("Cargar más" con paginación por cursor)
+
+CV_SECCION_POR_PAGINA = int(os.getenv("CV_SECCION_POR_PAGINA", 20))
+
+# Con 1 la siguiente página se carga sola al llegar al final (scroll infinito)
+
+CV_SECCION_SCROLL_INFINITO = os.getenv("CV_SECCION_SCROLL_INFINITO", "0") == "1"
+
+# Fragmentos HTML cacheados (sección y tarjetas); se invalidan por versión, esto es solo el tope
+
+CV_SECCION_CACHE_TIMEOUT = int(os.getenv("CV_SECCION_CACHE_TIMEOUT", 60 * 60 * 24 * 7))
+
+
+# Caché de página completa (home y secciones) para visitas anónimas. Los cambios de contenido
+
+# la invalidan por versión; el timeout acota cuánto sobrevive una página después de un deploy
+
+CV_PAGINA_CACHE = os.getenv("CV_PAGINA_CACHE", "0") == "1"
+
+CV_PAGINA_CACHE_TIMEOUT = int(os.getenv("CV_PAGINA_CACHE_TIMEOUT", 60 * 60))
+
+
 # =====================
 
 # DEFAULT
@@ -0,0 +1,13 @@
+# gunicorn lee este archivo solo si arranca desde la raíz del proyecto
+
+
+
+def post_worker_init(worker):
+
+    # Deja las fuentes del PDF cargadas antes de la primera petición a /imprimir/
+
+    from cv.fuentes import registrar_fuentes
+
+
+    registrar_fuentes()
+